@@ -0,0 +1,78 @@
+"""Headless Mux pricing core.
+
+Submodules are imported on first attribute access so that ``import pricing`` stays
+cheap; pandas is only loaded by the helpers that build DataFrames.
+"""
+import importlib
+
+_EXPORTS = {
+    'RateCard': 'pricing.engine',
+    'calculate_spend': 'pricing.engine',
+    'price_scenarios': 'pricing.engine',
+    'RATES_PATH': 'pricing.rates',
+    'load_pricing_csv': 'pricing.rates',
+    'load_rate_card': 'pricing.rates',
+    'RateCardError': 'pricing.rates',
+    'validate_rate_card': 'pricing.rates',
+    'build_artifact': 'pricing.rates',
+    'rate_card_versions': 'pricing.rates',
+    'rate_card_path': 'pricing.rates',
+    'RateCardWatcher': 'pricing.rates',
+    'on_rate_card_change': 'pricing.rates',
+    'DEFAULT_INPUTS': 'pricing.usage',
+    'load_sku_drivers': 'pricing.usage',
+    'sku_usage': 'pricing.usage',
+    'usage_matrix': 'pricing.usage',
+    'usage_factors': 'pricing.usage',
+    'usage_frame': 'pricing.usage',
+    'canonical_inputs': 'pricing.usage',
+    'calculate_gb_volumes': 'pricing.usage',
+    'STARTER_PLAN_COST': 'pricing.totals',
+    'STARTER_PLAN_CREDIT': 'pricing.totals',
+    'Totals': 'pricing.totals',
+    'calculate_totals': 'pricing.totals',
+    'quote': 'pricing.totals',
+    'calculate_batch_totals': 'pricing.totals',
+    'quote_batch': 'pricing.totals',
+    'spend_curve': 'pricing.sweep',
+    'tier_breakpoints': 'pricing.sweep',
+    'max_sku_usage': 'pricing.solver',
+    'max_volume': 'pricing.solver',
+    'optimize': 'pricing.optimizer',
+    'simulate': 'pricing.montecarlo',
+    'project': 'pricing.projection',
+    'project_batch': 'pricing.projection',
+    'ScenarioCache': 'pricing.cache',
+    'cached_quote': 'pricing.cache',
+    'IncrementalQuote': 'pricing.incremental',
+    'input_dependencies': 'pricing.incremental',
+    'Comparison': 'pricing.compare',
+    'compare_quote': 'pricing.compare',
+    'compare_batch': 'pricing.compare',
+    'ExactRateCard': 'pricing.fixedpoint',
+    'price_scenarios_exact': 'pricing.fixedpoint',
+    'calculate_spend_exact': 'pricing.fixedpoint',
+    'calculate_totals_exact': 'pricing.fixedpoint',
+    'calculate_batch_totals_exact': 'pricing.fixedpoint',
+    'quote_exact': 'pricing.fixedpoint',
+    'quote_batch_exact': 'pricing.fixedpoint',
+    'to_dollars': 'pricing.fixedpoint',
+    'PortfolioResult': 'pricing.portfolio',
+    'price_portfolio': 'pricing.portfolio',
+    'LogUsage': 'pricing.ingest',
+    'ingest_logs': 'pricing.ingest',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'pricing' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,131 @@
+"""JSON quoting service for billing and CRM integrations.
+
+    gunicorn --chdir app --preload --workers 4 pricing.api:app
+
+``POST /quote`` prices one mapping of calculator inputs; ``POST /quote/batch``
+prices ``{"scenarios": [...]}`` as one vectorized batch. Missing inputs fall back
+to the calculator defaults (see ``pricing.usage.DEFAULT_INPUTS``). Both return the
+per-SKU spend and the ``calculate_totals`` figures; a batch may pass
+``"include_sku_spend": false`` to receive only the totals.
+
+The compiled rate card is memory-mapped when the app is created, so with
+``--preload`` every worker shares the master's pages, and without it each worker
+maps the same artifact once. Each worker watches ``rates.csv`` and starts pricing
+with a changed file within ``MUX_PRICING_RELOAD_INTERVAL`` seconds, no restart needed.
+"""
+from pricing.usage import PERCENT_INPUTS, PRICING_COLUMNS
+
+MAX_BATCH_SCENARIOS = 100_000
+
+
+class QuoteRequestError(ValueError):
+    pass
+
+
+def _column(key, values):
+    import numpy as np
+
+    # Check types over the whole column at once; bool is an int subclass, so it is named explicitly
+    types = set(map(type, values))
+    if key == 'baseline_toggle':
+        if not types <= {bool}:
+            raise QuoteRequestError(f"{key} must be true or false")
+        return np.array(values, dtype=bool)
+    if not types <= {int, float}:
+        raise QuoteRequestError(f"{key} must be a non-negative number")
+    column = np.array(values, dtype=np.float64)
+    if not np.isfinite(column).all() or (column < 0).any():
+        raise QuoteRequestError(f"{key} must be a non-negative number")
+    if key in PERCENT_INPUTS and (column > 100).any():
+        raise QuoteRequestError(f"{key} must be a percentage between 0 and 100")
+    return column
+
+
+def parse_scenarios(scenarios):
+    """Validate a list of input mappings and turn it into ``usage_matrix`` columns."""
+    from pricing.usage import DEFAULT_INPUTS
+
+    if not isinstance(scenarios, list) or not all(isinstance(scenario, dict) for scenario in scenarios):
+        raise QuoteRequestError("scenarios must be a list of objects")
+    if len(scenarios) > MAX_BATCH_SCENARIOS:
+        raise QuoteRequestError(f"At most {MAX_BATCH_SCENARIOS:,} scenarios per request")
+    keys = set().union(*scenarios)
+    unknown = sorted(keys.difference(PRICING_COLUMNS))
+    if unknown:
+        raise QuoteRequestError(f"Unknown inputs: {', '.join(unknown)}")
+    return {key: _column(key, [scenario.get(key, DEFAULT_INPUTS[key]) for scenario in scenarios])
+            for key in PRICING_COLUMNS if key in keys}
+
+
+def price(columns, n_scenarios, rate_card):
+    """Per-SKU spend and batch totals for parsed scenario columns."""
+    from pricing.totals import calculate_batch_totals
+    from pricing.usage import usage_matrix
+
+    skus, usage = usage_matrix(columns, n_scenarios)
+    rows = rate_card.rows(skus)
+    try:
+        spend = rate_card.spend(rows, usage)
+    except ValueError as exc:
+        # Usage beyond the rate card's last tier
+        raise QuoteRequestError(str(exc)) from None
+    categories = rate_card.categories[rows]
+    return skus, categories, usage, spend, calculate_batch_totals(spend, categories)
+
+
+def create_app(rate_card=None):
+    import numpy as np
+    from flask import Flask, jsonify, request
+
+    from pricing.rates import load_rate_card
+    from pricing.totals import STARTER_PLAN_COST
+
+    # Without a fixed card each request prices with the watched current card
+    current_rate_card = (lambda: rate_card) if rate_card is not None else load_rate_card
+    current_rate_card()
+    app = Flask(__name__)
+    app.json.sort_keys = False
+
+    def body():
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            raise QuoteRequestError("Request body must be a JSON object")
+        return payload
+
+    @app.errorhandler(QuoteRequestError)
+    def bad_request(error):
+        return jsonify(error=str(error)), 400
+
+    @app.get('/health')
+    def health():
+        return jsonify(status='ok')
+
+    @app.post('/quote')
+    def quote():
+        skus, categories, usage, spend, totals = price(parse_scenarios([body()]), 1, current_rate_card())
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where(usage[0] > 0, spend[0] / usage[0], np.nan)
+        lines = [{'sku': sku, 'sku_category': category, 'usage': used, 'total_spend': cost,
+                  'effective_rate': None if rate != rate else rate}
+                 for sku, category, used, cost, rate in zip(skus, categories.tolist(), usage[0].tolist(),
+                                                            spend[0].tolist(), rates.tolist())]
+        return jsonify(skus=lines, developer_plan_cost=STARTER_PLAN_COST,
+                       **{key: value[0].item() for key, value in totals.items()})
+
+    @app.post('/quote/batch')
+    def quote_batch():
+        payload = body()
+        scenarios = payload.get('scenarios')
+        skus, categories, usage, spend, totals = price(parse_scenarios(scenarios), len(scenarios),
+                                                        current_rate_card())
+        response = {'skus': skus, 'sku_categories': categories.tolist()}
+        # Encoding the (scenarios x SKUs) matrix dominates large responses, so callers may skip it
+        if payload.get('include_sku_spend', True):
+            response['sku_spend'] = spend.tolist()
+        return jsonify(developer_plan_cost=STARTER_PLAN_COST, **response,
+                       **{key: value.tolist() for key, value in totals.items()})
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,175 @@
+"""Bulk quoting: price a file of customer usage records in bounded-size chunks.
+
+    python -m pricing.bulk usage.parquet quotes.csv --workers 8 --chunk-size 200000
+
+Run from the ``app`` directory (or with it on ``PYTHONPATH``). Each input row needs
+the four monthly volume columns; the resolution mix, storage lifecycle and
+``baseline_toggle`` columns are optional and fall back to the calculator defaults.
+Any other column (e.g. a customer id) is copied through to the output.
+
+``--compare VERSION`` also prices every row under another rate card version (a
+name from ``rates.rate_card_versions`` or a CSV path) and adds its Starter Plan
+total and the change from the current card, to size a price change across the
+whole customer list. ``--exact`` prices in integer micro-dollars (see
+``pricing.fixedpoint``) and writes every amount as a ``*_micros`` column, for
+reconciliation against invoices.
+"""
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import time
+
+from pricing.usage import PRICING_COLUMNS, VOLUME_INPUTS
+
+REQUIRED_COLUMNS = VOLUME_INPUTS
+
+# Set once per worker process by the pool initializer
+_rate_card = None
+_compare_rate_card = None
+
+
+def _is_parquet(path):
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def read_chunks(path, chunk_size):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    def __init__(self, path):
+        self.path = path
+        self._parquet_writer = None
+        self._header = True
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _init_worker(rates_path, compare_path=None):
+    from pricing.rates import load_rate_card
+
+    global _rate_card, _compare_rate_card
+    _rate_card = load_rate_card(rates_path)
+    _compare_rate_card = load_rate_card(compare_path) if compare_path else None
+
+
+def usage_inputs(records):
+    """Calculator input columns of a frame of usage records, as arrays."""
+    missing = [column for column in REQUIRED_COLUMNS if column not in records]
+    if missing:
+        raise ValueError(f"Usage records are missing required columns: {', '.join(missing)}")
+    inputs = {column: records[column].to_numpy() for column in PRICING_COLUMNS if column in records}
+    if 'baseline_toggle' in inputs and inputs['baseline_toggle'].dtype == object:
+        inputs['baseline_toggle'] = records['baseline_toggle'].astype(str).str.lower().eq('true').to_numpy()
+    return inputs
+
+
+def price_chunk(chunk, rate_card=None, compare_rate_card=None, exact=False):
+    import pandas as pd
+
+    from pricing.fixedpoint import quote_batch_exact
+    from pricing.totals import quote_batch
+
+    inputs = usage_inputs(chunk)
+    quote = quote_batch_exact if exact else quote_batch
+    priced = quote(inputs, len(chunk), rate_card or _rate_card)
+    compare_rate_card = compare_rate_card or _compare_rate_card
+    if compare_rate_card is not None:
+        compared = quote(inputs, len(chunk), compare_rate_card)['total_spend_developer_plan']
+        priced['compare_total_spend_developer_plan'] = compared
+        priced['compare_delta'] = compared - priced['total_spend_developer_plan']
+    if exact:
+        priced = {f"{name}_micros": values for name, values in priced.items()}
+    passthrough = chunk.drop(columns=[column for column in chunk if column in PRICING_COLUMNS])
+    return pd.concat([passthrough.reset_index(drop=True), pd.DataFrame(priced)], axis=1)
+
+
+def run(input_path, output_path, chunk_size=100_000, workers=1, log=None, compare=None, exact=False):
+    from pricing.rates import RATES_PATH, load_rate_card, rate_card_path
+
+    # Builds the compiled artifacts if needed, so the workers only memory-map them
+    rate_card = load_rate_card(RATES_PATH)
+    compare_path = rate_card_path(compare) if compare else None
+    compare_rate_card = load_rate_card(compare_path) if compare_path else None
+    writer = ChunkWriter(output_path)
+    rows = 0
+    started = time.perf_counter()
+
+    def write(priced):
+        nonlocal rows
+        writer.write(priced)
+        rows += len(priced)
+        if log is not None:
+            elapsed = time.perf_counter() - started
+            print(f"{rows:,} rows priced ({rows / elapsed:,.0f} rows/s)", file=log)
+
+    try:
+        if workers <= 1:
+            for chunk in read_chunks(input_path, chunk_size):
+                write(price_chunk(chunk, rate_card, compare_rate_card, exact))
+        else:
+            # Workers memory-map the shared compiled rate card; only usage chunks travel
+            # per task, and at most two chunks per worker are in flight at any time.
+            with concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=_init_worker, initargs=(RATES_PATH, compare_path)) as pool:
+                pending = collections.deque()
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(price_chunk, chunk, exact=exact))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price customer usage records in bulk.")
+    parser.add_argument('input', help="usage records (.csv, .csv.gz or .parquet)")
+    parser.add_argument('output', help="quotes to write (.csv or .parquet)")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="rows per chunk (default: 100000)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes; 1 prices in-process (default: CPU count)")
+    parser.add_argument('--compare', metavar='VERSION',
+                        help="also price under this rate card version or CSV and report the change")
+    parser.add_argument('--exact', action='store_true',
+                        help="price in integer micro-dollars and write *_micros columns")
+    parser.add_argument('--quiet', action='store_true', help="only print the final summary")
+    args = parser.parse_args(argv)
+
+    rows, elapsed = run(args.input, args.output, args.chunk_size, args.workers,
+                        log=None if args.quiet else sys.stderr, compare=args.compare,
+                        exact=args.exact)
+    print(f"Priced {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Memoized quotes shared by every session of a server process.
+
+``cached_quote`` keys results on ``usage.canonical_inputs`` plus the rate card
+version, so reruns that do not change a pricing input (navigation, Share URL,
+widget hovers) and visitors landing on the same shared scenario reuse one result.
+The cache is a bounded LRU guarded by a lock, since Streamlit runs sessions on
+separate threads. When a watched rate card is reloaded, the quotes priced with
+the version it replaced are evicted.
+
+``cached_section`` memoizes the output of a page section (a chart spec, a table)
+the same way, keyed on the section's own widget values as well, so reruns that
+leave a section's inputs alone do not rebuild it.
+"""
+import collections
+import threading
+
+from pricing.rates import on_rate_card_change
+
+DEFAULT_MAXSIZE = 4096
+SECTION_MAXSIZE = 64
+
+
+class ScenarioCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Compute outside the lock; a concurrent miss on the same key just computes it twice
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def evict(self, predicate):
+        """Drop the entries whose key satisfies ``predicate``; returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+scenario_cache = ScenarioCache()
+# Section outputs hold whole chart datasets, so far fewer of them are kept
+section_cache = ScenarioCache(SECTION_MAXSIZE)
+
+
+@on_rate_card_change
+def _evict_replaced(old, new):
+    for cache in (scenario_cache, section_cache):
+        cache.evict(lambda key: key[0] == old.version)
+
+
+def cached_quote(inputs, rate_card=None, cache=None, compute=None):
+    """``totals.quote`` memoized on the pricing inputs and rate card version.
+
+    ``compute`` replaces ``totals.quote`` on a miss (e.g. an incremental update of a
+    session's previous result); it must price the same ``inputs``. The returned
+    ``Totals`` (including ``spend_df``) is shared between callers and must not be
+    modified in place.
+    """
+    from pricing.rates import load_rate_card
+    from pricing.totals import quote
+    from pricing.usage import canonical_inputs
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    if cache is None:
+        cache = scenario_cache
+    key = (rate_card.version, canonical_inputs(inputs))
+    return cache.get_or_compute(key, compute or (lambda: quote(inputs, rate_card)))
+
+
+def cached_section(name, params, inputs, rate_card, compute, cache=None):
+    """``compute()`` memoized on the section ``name``, its hashable widget ``params`` and the pricing inputs.
+
+    As with ``cached_quote``, the result is shared between sessions and must not be
+    modified in place.
+    """
+    from pricing.usage import canonical_inputs
+
+    if cache is None:
+        cache = section_cache
+    key = (rate_card.version, canonical_inputs(inputs), name, params)
+    return cache.get_or_compute(key, compute)
@@ -0,0 +1,96 @@
+"""Price the same scenarios under two rate cards and report what changes.
+
+Usage is derived once and priced under both cards, so a comparison costs one
+usage matrix and two tier lookups. ``compare_quote`` breaks one scenario down by
+SKU; ``compare_batch`` reports every scenario's Starter Plan total under both
+cards and the per-SKU spend change summed over the batch, in bounded-size chunks.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+
+class Comparison(NamedTuple):
+    spend_df: object
+    before: float
+    after: float
+    delta: float
+
+
+def _load(rate_card):
+    from pricing.rates import load_rate_card, rate_card_path
+
+    if rate_card is None:
+        return load_rate_card()
+    if isinstance(rate_card, str):
+        return load_rate_card(rate_card_path(rate_card))
+    return rate_card
+
+
+def _price(skus, usage, before, after):
+    from pricing.totals import calculate_batch_totals
+
+    rows_before = before.rows(skus)
+    rows_after = after.rows(skus)
+    spend_before = before.spend(rows_before, usage)
+    spend_after = after.spend(rows_after, usage)
+    return (spend_before, spend_after,
+            calculate_batch_totals(spend_before, before.categories[rows_before])['total_spend_developer_plan'],
+            calculate_batch_totals(spend_after, after.categories[rows_after])['total_spend_developer_plan'])
+
+
+def compare_quote(inputs, before=None, after=None):
+    """Per-SKU spend of one scenario under ``before`` and ``after``.
+
+    Either card may be a ``RateCard``, a version name from ``rates.rate_card_versions``
+    or a CSV path; None is the current card. ``before``/``after``/``delta`` are
+    the Starter Plan monthly totals.
+    """
+    import pandas as pd
+
+    from pricing.usage import usage_matrix
+
+    before, after = _load(before), _load(after)
+    skus, usage = usage_matrix(inputs, 1)
+    spend_before, spend_after, total_before, total_after = _price(skus, usage, before, after)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta_percent = (spend_after[0] - spend_before[0]) / spend_before[0] * 100
+    spend_df = pd.DataFrame({
+        'sku_category': after.categories[after.rows(skus)],
+        'sku': list(skus),
+        'usage': usage[0],
+        'spend_before': spend_before[0],
+        'spend_after': spend_after[0],
+        'delta': spend_after[0] - spend_before[0],
+        'delta_percent': delta_percent,
+    })
+    return Comparison(spend_df, float(total_before[0]), float(total_after[0]),
+                      float(total_after[0] - total_before[0]))
+
+
+def compare_batch(inputs, n_scenarios, before=None, after=None, chunk_size=100_000):
+    """``compare_quote`` for inputs given as length-``n_scenarios`` columns (e.g. a customer list).
+
+    Returns a dict with length-N ``before``, ``after`` and ``delta`` Starter Plan
+    totals, plus ``skus`` and ``sku_delta``: each SKU's spend change summed over
+    all scenarios.
+    """
+    from pricing.usage import usage_matrix
+
+    before, after = _load(before), _load(after)
+    totals = {name: np.empty(n_scenarios) for name in ('before', 'after')}
+    sku_delta = None
+    for start in range(0, n_scenarios, chunk_size):
+        stop = min(start + chunk_size, n_scenarios)
+        chunk = {key: value[start:stop] if np.ndim(value) else value for key, value in inputs.items()}
+        skus, usage = usage_matrix(chunk, stop - start)
+        spend_before, spend_after, totals['before'][start:stop], totals['after'][start:stop] = _price(
+            skus, usage, before, after)
+        chunk_delta = (spend_after - spend_before).sum(axis=0)
+        sku_delta = chunk_delta if sku_delta is None else sku_delta + chunk_delta
+    if sku_delta is None:
+        from pricing.usage import load_sku_drivers
+
+        skus = load_sku_drivers().skus
+        sku_delta = np.zeros(len(skus))
+    return {**totals, 'delta': totals['after'] - totals['before'], 'skus': list(skus), 'sku_delta': sku_delta}
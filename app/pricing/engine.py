@@ -0,0 +1,113 @@
+import hashlib
+
+import numpy as np
+
+
+class RateCard:
+    """Pricing tiers from rates.csv compiled into per-``unique_key`` arrays.
+
+    Row ``i`` of ``start``/``price``/``previous_tier_max_spend`` holds the tiers of
+    ``keys[i]`` sorted by ``start``. Keys with fewer tiers than the widest key are
+    padded with ``inf`` starts so the padding is never selected by a lookup.
+    ``version`` identifies the rate card contents (the source CSV's sha256 when
+    loaded through ``pricing.rates``, otherwise a hash of the arrays).
+    """
+
+    def __init__(self, keys, categories, start, end, price, previous_tier_max_spend, version=None):
+        self.keys = tuple(keys)
+        self.categories = np.asarray(categories, dtype=object)
+        # Plain ndarray views: indexing an np.memmap subclass is several times slower
+        self.start = np.asarray(start)
+        self.end = np.asarray(end)
+        self.price = np.asarray(price)
+        self.previous_tier_max_spend = np.asarray(previous_tier_max_spend)
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+        if version is None:
+            digest = hashlib.sha256(repr((self.keys, self.categories.tolist())).encode())
+            for array in (self.start, self.end, self.price, self.previous_tier_max_spend):
+                digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+            version = digest.hexdigest()
+        self.version = version
+
+    @classmethod
+    def from_frame(cls, pricing_tiers):
+        import pandas as pd
+
+        tiers = pricing_tiers.sort_values(['unique_key', 'start'], kind='stable')
+        keys = pd.unique(pricing_tiers['unique_key'])
+        key_rows = pd.Index(keys).get_indexer(tiers['unique_key'])
+        tier_slots = tiers.groupby('unique_key', sort=False).cumcount().to_numpy()
+        shape = (len(keys), tier_slots.max() + 1)
+
+        start = np.full(shape, np.inf)
+        price = np.zeros(shape)
+        previous_tier_max_spend = np.zeros(shape)
+        start[key_rows, tier_slots] = tiers['start'].to_numpy(dtype=np.float64)
+        price[key_rows, tier_slots] = tiers['price'].to_numpy(dtype=np.float64)
+        previous_tier_max_spend[key_rows, tier_slots] = tiers['previous_tier_max_spend'].to_numpy(dtype=np.float64)
+
+        end = tiers.groupby('unique_key', sort=False)['end'].max().reindex(keys).to_numpy(dtype=np.float64)
+        categories = tiers.groupby('unique_key', sort=False)['sku_category'].first().reindex(keys).to_numpy()
+        return cls(keys, categories, start, end, price, previous_tier_max_spend)
+
+    @classmethod
+    def from_csv(cls, file_path):
+        from pricing.rates import load_pricing_csv
+
+        return cls.from_frame(load_pricing_csv(file_path))
+
+    def rows(self, skus):
+        try:
+            return np.array([self.key_index[sku] for sku in skus], dtype=np.intp)
+        except KeyError as exc:
+            raise KeyError(f"No pricing tiers for SKU {exc.args[0]!r}") from None
+
+    def tier_index(self, rows, usage):
+        # searchsorted(start, usage, side='right') - 1, unrolled over the (few) tier
+        # slots so every SKU and scenario is resolved in the same array operation
+        usage = np.asarray(usage, dtype=np.float64)
+        start = self.start[rows]
+        tiers = np.zeros(np.broadcast_shapes(usage.shape, rows.shape), dtype=np.intp)
+        for slot in range(1, start.shape[-1]):
+            tiers += usage >= start[..., slot]
+        out_of_range = ~((usage >= start[..., 0]) & (usage < self.end[rows]))
+        if out_of_range.any():
+            bad = tuple(np.argwhere(out_of_range)[0])
+            sku = self.keys[np.broadcast_to(rows, out_of_range.shape)[bad]]
+            value = np.broadcast_to(usage, out_of_range.shape)[bad]
+            raise ValueError(f"Usage {value:g} for SKU {sku!r} is outside its pricing tiers")
+        return tiers
+
+    def spend(self, rows, usage, tiers=None):
+        usage = np.asarray(usage, dtype=np.float64)
+        tiers = self.tier_index(rows, usage) if tiers is None else tiers.copy()
+        # Gather through flat indices into the (keys x tiers) tables
+        tiers += rows * self.start.shape[1]
+        marginal_spend = (usage - self.start.take(tiers)) * self.price.take(tiers)
+        return self.previous_tier_max_spend.take(tiers) + marginal_spend
+
+
+def calculate_spend(df, rate_card):
+    import pandas as pd
+
+    skus = df['SKU Name'].to_numpy()
+    usage = df['Usage Value'].to_numpy(dtype=np.float64)
+    rows = rate_card.rows(skus)
+    total_spend = rate_card.spend(rows, usage)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effective_rate = total_spend / usage
+    return pd.DataFrame({
+        'sku_category': rate_card.categories[rows],
+        'sku': skus,
+        'usage': usage,
+        'effective_rate': effective_rate,
+        'total_spend': total_spend,
+    })
+
+
+def price_scenarios(rate_card, skus, usage_matrix):
+    """Total spend for an (N scenarios x SKUs) usage matrix, one column per ``skus`` entry."""
+    usage_matrix = np.asarray(usage_matrix, dtype=np.float64)
+    if usage_matrix.shape[-1] != len(skus):
+        raise ValueError(f"Usage matrix has {usage_matrix.shape[-1]} columns for {len(skus)} SKUs")
+    return rate_card.spend(rate_card.rows(skus), usage_matrix)
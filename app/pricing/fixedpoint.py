@@ -0,0 +1,204 @@
+"""Exact pricing on int64 arrays of micro-dollars.
+
+The float engine is exact to well under a cent for a single quote, but sums of
+many SKUs and scenarios, or reconciling against an invoice, need every amount to
+be reproducible to the last digit. Here prices and spend are integers:
+
+- Usage is quantized to thousandths of a unit (``USAGE_SCALE``), rounding half up.
+- A SKU's spend is its tier's ``previous_tier_max_spend`` plus
+  ``(usage - tier start) * price``, rounded half up to a whole micro-dollar. That
+  is the only rounding of spend: category subtotals, totals and batch sums are
+  exact integer sums of the SKU spends.
+- Effective rate is spend / usage in micro-dollars per unit, rounded half up, and
+  0 when there is no usage.
+- The Starter Plan credit and floor are applied to the integer totals exactly as
+  ``pricing.totals`` applies them to floats.
+
+A rate card converts only if every price is a whole number of micro-dollars per
+unit (at most six decimals) and every ``previous_tier_max_spend`` a whole number
+of micro-dollars. Each tier's start and cumulative spend fold into one integer
+offset, so a lookup costs one multiply, add and floor division.
+"""
+import decimal
+import functools
+
+import numpy as np
+
+MICROS = 1_000_000
+USAGE_SCALE = 1000
+INT64_MAX = np.iinfo(np.int64).max
+
+
+class ExactRateCard:
+    """A ``RateCard`` in integers: starts in thousandths of a unit, prices in micro-dollars per unit."""
+
+    def __init__(self, rate_card):
+        from pricing.rates import RateCardError
+
+        self.keys = rate_card.keys
+        self.categories = rate_card.categories
+        self.version = rate_card.version
+        self.rows = rate_card.rows
+        padding = ~np.isfinite(rate_card.start)
+        start = np.where(padding, 0, rate_card.start)
+
+        def exact(values, scale, name):
+            scaled = np.rint(np.asarray(values, dtype=np.float64) * scale)
+            bad = (scaled / scale != values) | (np.abs(scaled) > 2 ** 53)
+            if bad.any():
+                key = self.keys[np.argwhere(bad)[0][0]]
+                raise RateCardError(f"{key}: {name} {np.asarray(values)[bad][0]!r} is not a whole number of "
+                                    f"1/{scale:,} units")
+            return scaled.astype(np.int64)
+
+        start_milli = exact(start, USAGE_SCALE, 'tier start')
+        self.price = exact(rate_card.price, MICROS, 'price')
+        previous_tier_max_spend = exact(rate_card.previous_tier_max_spend, MICROS, 'previous_tier_max_spend')
+        self.start = np.where(padding, INT64_MAX, start_milli)
+        # (usage - start) * price / USAGE_SCALE + previous, rounded half up, as one floor division
+        self.offset = np.where(padding, 0, previous_tier_max_spend * USAGE_SCALE - start_milli * self.price
+                               + USAGE_SCALE // 2)
+        self.max_usage = (INT64_MAX - int(self.offset.max())) // max(int(self.price.max()), 1)
+        # Usage at or past ``end`` has no tier, or would overflow usage * price
+        self.end = np.minimum(exact(rate_card.end, USAGE_SCALE, 'tier end'), self.max_usage + 1).astype(np.uint64)
+
+    def tier_index(self, rows, usage):
+        """Tier of each integer ``usage`` (thousandths of a unit); same rules as ``RateCard.tier_index``."""
+        start = self.start[rows]
+        tiers = np.zeros(np.broadcast_shapes(usage.shape, rows.shape), dtype=np.intp)
+        for slot in range(1, start.shape[-1]):
+            tiers += usage >= start[..., slot]
+        # Viewed as unsigned, negative usage is above every end, so one comparison checks both bounds
+        out_of_range = ~(usage.view(np.uint64) < self.end[rows])
+        if out_of_range.any():
+            bad = tuple(np.argwhere(out_of_range)[0])
+            sku = self.keys[np.broadcast_to(rows, out_of_range.shape)[bad]]
+            value = np.broadcast_to(usage, out_of_range.shape)[bad]
+            if value < 0:
+                raise ValueError(f"Usage for SKU {sku!r} is negative or not a number")
+            raise ValueError(f"Usage {value / USAGE_SCALE:g} for SKU {sku!r} is outside its pricing tiers "
+                             f"or too large to price exactly")
+        return tiers
+
+    def spend(self, rows, usage, tiers=None):
+        """Micro-dollar spend for integer ``usage`` in thousandths of a unit."""
+        tiers = self.tier_index(rows, usage) if tiers is None else tiers.copy()
+        tiers += rows * self.start.shape[1]
+        spend = usage * self.price.take(tiers)
+        spend += self.offset.take(tiers)
+        spend //= USAGE_SCALE
+        return spend
+
+
+@functools.lru_cache(maxsize=8)
+def exact_rate_card(rate_card):
+    """The ``ExactRateCard`` of ``rate_card``, converted once per card."""
+    return ExactRateCard(rate_card)
+
+
+def quantize_usage(usage):
+    """Usage in thousandths of a unit as int64, rounding half up.
+
+    Negative or non-finite usage quantizes to a negative or out-of-range value that
+    the tier lookup rejects.
+    """
+    scaled = np.multiply(usage, USAGE_SCALE, dtype=np.float64)
+    scaled += 0.5
+    with np.errstate(invalid='ignore'):
+        return scaled.astype(np.int64)
+
+
+def to_dollars(micros):
+    """Exact ``decimal.Decimal`` dollars for an integer number of micro-dollars."""
+    return decimal.Decimal(int(micros)).scaleb(-6)
+
+
+def effective_rate(spend, usage):
+    """Micro-dollars per unit for micro-dollar ``spend`` and quantized ``usage``, rounded half up; 0 without usage."""
+    spend = np.asarray(spend, dtype=np.int64)
+    usage = np.asarray(usage, dtype=np.int64)
+    has_usage = usage > 0
+    divisor = np.where(has_usage, usage, 1)
+    return np.where(has_usage, (spend * USAGE_SCALE + divisor // 2) // divisor, 0)
+
+
+def price_scenarios_exact(rate_card, skus, usage_matrix):
+    """``engine.price_scenarios`` in int64 micro-dollars."""
+    usage_matrix = np.asarray(usage_matrix)
+    if usage_matrix.shape[-1] != len(skus):
+        raise ValueError(f"Usage matrix has {usage_matrix.shape[-1]} columns for {len(skus)} SKUs")
+    exact = exact_rate_card(rate_card)
+    return exact.spend(exact.rows(skus), quantize_usage(usage_matrix))
+
+
+def calculate_spend_exact(df, rate_card):
+    """``engine.calculate_spend`` with int64 ``usage_milli``, ``effective_rate_micros`` and ``total_spend_micros``."""
+    import pandas as pd
+
+    exact = exact_rate_card(rate_card)
+    skus = df['SKU Name'].to_numpy()
+    usage = quantize_usage(df['Usage Value'].to_numpy(dtype=np.float64))
+    rows = exact.rows(skus)
+    total_spend = exact.spend(rows, usage)
+    return pd.DataFrame({
+        'sku_category': exact.categories[rows],
+        'sku': skus,
+        'usage_milli': usage,
+        'effective_rate_micros': effective_rate(total_spend, usage),
+        'total_spend_micros': total_spend,
+    })
+
+
+def calculate_totals_exact(spend_df):
+    """``totals.calculate_totals`` for a ``calculate_spend_exact`` frame; every figure is int micro-dollars."""
+    from pricing.totals import STARTER_PLAN_COST, Totals
+
+    totals = calculate_batch_totals_exact(spend_df['total_spend_micros'].to_numpy()[None, :],
+                                          spend_df['sku_category'].to_numpy())
+    return Totals(spend_df, *(int(totals[name][0]) for name in (
+        'storage_spend', 'encoding_spend', 'streaming_spend', 'total_spend', 'mux_credits',
+        'total_spend_developer_plan')), STARTER_PLAN_COST * MICROS)
+
+
+def calculate_batch_totals_exact(spend_matrix, categories):
+    """``totals.calculate_batch_totals`` for an int64 micro-dollar spend matrix."""
+    from pricing.totals import STARTER_PLAN_COST, STARTER_PLAN_CREDIT
+
+    categories = np.asarray(categories)
+    # Integer matrix product: exact, and far faster than summing column subsets
+    category_totals = spend_matrix @ (categories[:, None] == np.array(['Storage', 'Encoding', 'Streaming'])
+                                      ).astype(np.int64)
+    storage_spend, encoding_spend, streaming_spend = category_totals.T
+    credit = STARTER_PLAN_CREDIT * MICROS
+    total_spend = spend_matrix.sum(axis=1) - credit
+    return {
+        'storage_spend': storage_spend,
+        'encoding_spend': encoding_spend,
+        'streaming_spend': streaming_spend,
+        'total_spend': total_spend,
+        'mux_credits': np.maximum(-credit, -(storage_spend + encoding_spend + streaming_spend)),
+        'total_spend_developer_plan': np.maximum(total_spend, STARTER_PLAN_COST * MICROS),
+    }
+
+
+def quote_exact(inputs, rate_card=None):
+    """``totals.quote`` in int micro-dollars."""
+    from pricing.rates import load_rate_card
+    from pricing.usage import usage_frame
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    return calculate_totals_exact(calculate_spend_exact(usage_frame(inputs), rate_card))
+
+
+def quote_batch_exact(inputs, n_scenarios, rate_card=None):
+    """``totals.quote_batch`` in int64 micro-dollars."""
+    from pricing.rates import load_rate_card
+    from pricing.usage import usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    exact = exact_rate_card(rate_card)
+    skus, usage = usage_matrix(inputs, n_scenarios)
+    rows = exact.rows(skus)
+    return calculate_batch_totals_exact(exact.spend(rows, quantize_usage(usage)), exact.categories[rows])
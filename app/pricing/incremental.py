@@ -0,0 +1,118 @@
+"""Dependency-tracked repricing for interactive edits.
+
+Each row of ``usage.usage_factors`` comes from one input, and the driver table says
+which factor rows every SKU multiplies, so an input feeds exactly the SKUs that
+reference its rows (``streaming_volume`` feeds the ``streaming_*`` SKUs, the
+lifecycle shares feed the storage SKUs, and so on). ``IncrementalQuote.update``
+compares the new factors with the previous ones, recomputes usage and spend for
+the SKUs fed by a changed factor only, and moves the category subtotals by the
+change in those SKUs' spend.
+"""
+import numpy as np
+
+CATEGORIES = ('Storage', 'Encoding', 'Streaming')
+
+
+def _fed_skus(drivers):
+    """Indices of the SKUs that reference each factor row."""
+    from pricing.usage import factor_inputs
+
+    references = np.stack([drivers.source, drivers.resolution, drivers.encoding_tier, drivers.storage_tier])
+    return [np.flatnonzero((references == factor).any(axis=0)) for factor in range(len(factor_inputs(drivers)))]
+
+
+def input_dependencies(drivers=None):
+    """Map each pricing input to the SKUs whose usage it feeds."""
+    from pricing.usage import factor_inputs, load_sku_drivers
+
+    if drivers is None:
+        drivers = load_sku_drivers()
+    dependencies = {}
+    for key, fed in zip(factor_inputs(drivers), _fed_skus(drivers)):
+        if key is not None:
+            dependencies.setdefault(key, set()).update(drivers.skus[i] for i in fed)
+    return {key: tuple(sku for sku in drivers.skus if sku in fed) for key, fed in dependencies.items()}
+
+
+class IncrementalQuote:
+    """A single scenario's usage, spend and category subtotals, kept current by ``update``.
+
+    Subtotals updated by difference pick up rounding error, so they are recomputed
+    from the per-SKU spend every ``resync_every`` updates.
+    """
+
+    def __init__(self, inputs=None, rate_card=None, drivers=None, resync_every=1024):
+        from pricing.rates import load_rate_card
+        from pricing.usage import load_sku_drivers, usage_factors
+
+        self.rate_card = rate_card if rate_card is not None else load_rate_card()
+        self.drivers = drivers if drivers is not None else load_sku_drivers()
+        self.resync_every = resync_every
+        self.skus = self.drivers.skus
+        self.rows = self.rate_card.rows(self.skus)
+        self.categories = self.rate_card.categories[self.rows]
+        self._category_index = np.array([CATEGORIES.index(c) if c in CATEGORIES else len(CATEGORIES)
+                                         for c in self.categories], dtype=np.intp)
+        self._fed = _fed_skus(self.drivers)
+
+        self._factors = usage_factors(dict(inputs or {}), 1, self.drivers)[:, 0]
+        self.usage = self._usage(slice(None), self._factors)
+        self.spend = self.rate_card.spend(self.rows, self.usage)
+        self.last_repriced = np.arange(len(self.skus))
+        self._updates = 0
+        self._resync()
+
+    def _usage(self, skus, factors):
+        drivers = self.drivers
+        # Same operation order as usage_matrix, so results are bit-identical
+        return (factors[drivers.source[skus]] * factors[drivers.resolution[skus]] / 100
+                * factors[drivers.encoding_tier[skus]] * factors[drivers.storage_tier[skus]])
+
+    def _resync(self):
+        self.category_spend = np.bincount(self._category_index, self.spend, minlength=len(CATEGORIES) + 1)
+        self.usage_spend = self.spend.sum()
+
+    def update(self, inputs):
+        """Reprice the SKUs fed by inputs that changed since the last update; returns self."""
+        from pricing.usage import usage_factors
+
+        factors = usage_factors(inputs, 1, self.drivers)[:, 0]
+        changed = np.flatnonzero(factors != self._factors)
+        if not len(changed):
+            self.last_repriced = changed
+            return self
+        dirty = np.unique(np.concatenate([self._fed[factor] for factor in changed]))
+        usage = self._usage(dirty, factors)
+        # Commit nothing until pricing succeeds, so a rejected input leaves the state as it was
+        spend = self.rate_card.spend(self.rows[dirty], usage)
+        self._factors = factors
+        delta = spend - self.spend[dirty]
+        self.usage[dirty] = usage
+        self.spend[dirty] = spend
+        self.last_repriced = dirty
+        self._updates += 1
+        if self._updates % self.resync_every == 0:
+            self._resync()
+        else:
+            np.add.at(self.category_spend, self._category_index[dirty], delta)
+            self.usage_spend += delta.sum()
+        return self
+
+    def totals(self):
+        """The current scenario as ``calculate_totals`` would report it."""
+        import pandas as pd
+
+        from pricing.totals import totals_from_subtotals
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            effective_rate = self.spend / self.usage
+        spend_df = pd.DataFrame({
+            'sku_category': self.categories,
+            'sku': list(self.skus),
+            'usage': self.usage.copy(),
+            'effective_rate': effective_rate,
+            'total_spend': self.spend.copy(),
+        })
+        storage_spend, encoding_spend, streaming_spend = self.category_spend[:len(CATEGORIES)].tolist()
+        return totals_from_subtotals(spend_df, storage_spend, encoding_spend, streaming_spend,
+                                     float(self.usage_spend))
@@ -0,0 +1,347 @@
+"""Derive calculator inputs from raw CDN delivery and playback logs.
+
+    python -m pricing.ingest logs/2026-09-*.jsonl.gz --workers 4 --ladder 1080p=5.5
+
+Reads gzipped (or plain) JSON Lines and CSV logs with pyarrow's streaming
+readers, one block at a time, so memory is bounded by the block size plus the
+per-asset totals. Each record is one delivery with any of these fields (rename
+them with ``fields``/``--field``):
+
+    bytes           bytes delivered
+    seconds         seconds watched (playback logs); used instead of bytes when present
+    resolution      rendition, e.g. ``1080p``, ``1080``, ``1920x1080`` or ``4k``
+    asset_id        asset the delivery belongs to
+    asset_duration  length of the asset in seconds (for the stored library)
+
+A delivery is billed at the smallest calculator resolution at least as tall as
+its rendition (anything above the largest counts as the largest; a missing or
+unreadable rendition as ``default_resolution``). Bytes become minutes at that
+resolution's bitrate from the ladder, with the same GB/Mbps convention as
+``usage.calculate_gb_volumes``. Minutes and bytes are summed per resolution and
+per asset, and ``LogUsage.inputs`` holds the ``streaming_volume`` and
+``resolution_mix_*`` inputs (plus ``storage_volume`` when asset durations are
+logged) scaled to one month. With ``workers`` > 1 files are split between
+worker processes.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+# Mbps of the top rendition at each calculator resolution
+DEFAULT_BITRATE_LADDER = {'720p': 3.5, '1080p': 6.0, '1440p': 10.0, '2160p': 16.0}
+DEFAULT_FIELDS = {'bytes': 'bytes', 'seconds': 'seconds', 'resolution': 'resolution', 'asset': 'asset_id',
+                  'duration': 'asset_duration'}
+NUMERIC_FIELDS = ('bytes', 'seconds', 'duration')
+# Named renditions; other labels are read as WIDTHxHEIGHT or HEIGHTp
+RESOLUTION_LABELS = {'sd': 480, 'hd': 720, 'fhd': 1080, 'full hd': 1080, 'qhd': 1440, '2k': 1440, 'uhd': 2160,
+                     '4k': 2160, '8k': 4320}
+DAYS_PER_MONTH = 365.25 / 12
+BLOCK_SIZE = 16 << 20
+# Partial per-asset totals are merged once this many rows have accumulated
+COMPACT_ROWS = 1 << 20
+
+
+class LogUsage(NamedTuple):
+    resolutions: tuple
+    minutes: object
+    bytes: object
+    assets: object
+    inputs: dict
+    records: int
+    input_bytes: int
+    seconds: float
+
+
+def _height(value):
+    """Rendition height of a resolution label, or None when it cannot be read."""
+    if isinstance(value, (int, float)):
+        return int(value) if value == value else None
+    label = str(value).strip().lower()
+    if label in RESOLUTION_LABELS:
+        return RESOLUTION_LABELS[label]
+    # 1920x1080, 1080p, 1080p60, 1080i or a bare 1080
+    match = (re.search(r'\d+\s*[x×]\s*(\d+)', label) or re.search(r'(\d+)[pi]', label)
+             or re.fullmatch(r'(\d+)', label))
+    return int(match.group(1)) if match else None
+
+
+def _format(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'json'
+    if name.endswith(('.csv', '.tsv')):
+        return 'csv'
+    raise ValueError(f"{path}: unknown log format; expected .jsonl, .ndjson, .json or .csv (optionally .gz)")
+
+
+def _batches(path, fields):
+    """Record batches of the logged ``fields`` (those present in the file) from one log file."""
+    import pyarrow as pa
+
+    if _format(path) == 'csv':
+        import pyarrow.csv as pv
+
+        types = {name: pa.float64() if key in NUMERIC_FIELDS else pa.string() for key, name in fields.items()}
+        yield from pv.open_csv(path, read_options=pv.ReadOptions(block_size=BLOCK_SIZE),
+                               parse_options=pv.ParseOptions(delimiter='\t' if '.tsv' in path else ','),
+                               convert_options=pv.ConvertOptions(column_types=types, include_columns=list(types),
+                                                                 include_missing_columns=True))
+        return
+
+    import gzip
+
+    import pyarrow.json as pj
+
+    # Non-numeric fields keep the JSON type of the first record that has them
+    # (a rendition may be logged as 1080 or "1080p")
+    with (gzip.open if path.endswith('.gz') else open)(path, 'rt') as f:
+        first = next((json.loads(line) for line in f if line.strip()), {})
+    schema = pa.schema([(name, pa.float64() if key in NUMERIC_FIELDS or isinstance(first.get(name), (int, float))
+                         else pa.string()) for key, name in fields.items()])
+    yield from pj.open_json(path, read_options=pj.ReadOptions(block_size=BLOCK_SIZE),
+                            parse_options=pj.ParseOptions(explicit_schema=schema, unexpected_field_behavior='ignore'))
+
+
+def _group_assets(table):
+    return table.group_by('asset_id').aggregate(
+        [('bytes', 'sum'), ('minutes', 'sum'), ('duration', 'max')]).rename_columns(
+        ['asset_id', 'bytes', 'minutes', 'duration'])
+
+
+class _Aggregate:
+    def __init__(self, ladder, default_resolution):
+        self.resolutions = tuple(sorted(ladder, key=_height))
+        self.heights = np.array([_height(resolution) for resolution in self.resolutions])
+        self.default = self.resolutions.index(default_resolution)
+        # Mbps to minutes per byte, as calculate_gb_volumes: GB * 8 * 1024 / Mbps / 60
+        self.minutes_per_byte = np.array([8 / 1024 ** 2 / ladder[resolution] / 60 for resolution in self.resolutions])
+        self.minutes = np.zeros(len(self.resolutions))
+        self.bytes = np.zeros(len(self.resolutions))
+        self.records = 0
+        self.assets = []
+        self._asset_rows = 0
+        self._buckets = {}
+
+    def _bucket(self, value):
+        if value not in self._buckets:
+            height = _height(value) if value is not None else None
+            if height is None:
+                self._buckets[value] = self.default
+            else:
+                self._buckets[value] = min(int(np.searchsorted(self.heights, height)), len(self.resolutions) - 1)
+        return self._buckets[value]
+
+    def add(self, batch, fields):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        n = batch.num_rows
+        if not n:
+            return
+        names = set(batch.schema.names)
+
+        def column(key):
+            name = fields.get(key)
+            if name not in names or batch.column(name).null_count == n:
+                return None
+            return batch.column(name)
+
+        def numbers(key):
+            values = column(key)
+            return None if values is None else np.nan_to_num(values.to_numpy(zero_copy_only=False))
+
+        resolution = column('resolution')
+        if resolution is None:
+            bucket = np.full(n, self.default)
+        else:
+            encoded = resolution.dictionary_encode()
+            lookup = np.array([self._bucket(value) for value in encoded.dictionary.to_pylist()] + [self.default])
+            indices = encoded.indices.fill_null(len(lookup) - 1)
+            bucket = lookup[indices.to_numpy(zero_copy_only=False)]
+        delivered = numbers('bytes')
+        watched = numbers('seconds')
+        if delivered is None and watched is None:
+            raise ValueError(f"Log records need a {fields['bytes']!r} or {fields['seconds']!r} field")
+        delivered = np.zeros(n) if delivered is None else delivered
+        minutes = delivered * self.minutes_per_byte[bucket]
+        if watched is not None:
+            minutes = np.where(pc.is_valid(column('seconds')).to_numpy(zero_copy_only=False), watched / 60, minutes)
+        self.minutes += np.bincount(bucket, minutes, minlength=len(self.resolutions))
+        self.bytes += np.bincount(bucket, delivered, minlength=len(self.resolutions))
+        self.records += n
+
+        asset = column('asset')
+        if asset is not None:
+            duration = numbers('duration')
+            table = pa.table({'asset_id': pc.cast(asset, pa.string()), 'bytes': delivered, 'minutes': minutes,
+                              'duration': np.zeros(n) if duration is None else duration})
+            self._add_assets(table)
+
+    def _add_assets(self, table):
+        self.assets.append(_group_assets(table))
+        self._asset_rows += self.assets[-1].num_rows
+        if self._asset_rows > COMPACT_ROWS:
+            self._compact()
+
+    def _compact(self):
+        import pyarrow as pa
+
+        if len(self.assets) > 1:
+            self.assets = [_group_assets(pa.concat_tables(self.assets))]
+        self._asset_rows = sum(table.num_rows for table in self.assets)
+
+    def merge(self, other):
+        self.minutes += other.minutes
+        self.bytes += other.bytes
+        self.records += other.records
+        self.assets += other.assets
+        self._asset_rows += other._asset_rows
+        self._compact()
+
+
+def _ingest_file(path, fields, ladder, default_resolution):
+    aggregate = _Aggregate(ladder, default_resolution)
+    for batch in _batches(path, fields):
+        aggregate.add(batch, fields)
+    aggregate._compact()
+    # Only plain data crosses the process boundary
+    aggregate._buckets = {}
+    return aggregate
+
+
+def calculator_inputs(resolutions, minutes, library_minutes=None, period_days=None):
+    """``streaming_volume``, ``resolution_mix_*`` (and ``storage_volume``) for one month of the logged traffic.
+
+    The mix is in whole percent summing to 100 (largest remainder rounding), as the
+    calculator's inputs take it.
+    """
+    scale = DAYS_PER_MONTH / period_days if period_days else 1.0
+    total = float(minutes.sum())
+    inputs = {'streaming_volume': round(total * scale)}
+    shares = minutes / total * 100 if total else np.zeros(len(resolutions))
+    mix = np.floor(shares).astype(int)
+    if total:
+        # Hand the percent lost to rounding down to the largest remainders
+        mix[np.argsort(-(shares - mix), kind='stable')[:100 - mix.sum()]] += 1
+    for resolution, percent in zip(resolutions, mix.tolist()):
+        inputs[f"resolution_mix_{resolution}"] = percent
+    if library_minutes is not None:
+        inputs['storage_volume'] = round(library_minutes)
+    return inputs
+
+
+def ingest_logs(paths, workers=1, ladder=None, fields=None, default_resolution=None, period_days=None, log=None):
+    """Aggregate log files into a ``LogUsage``.
+
+    ``ladder`` maps calculator resolutions to Mbps (``DEFAULT_BITRATE_LADDER``
+    entries it does not set are kept); ``fields`` renames log fields (see the
+    module docstring). ``period_days`` is the span the logs cover; volumes are
+    scaled to one month (the logs are taken to cover a month when it is None).
+    The stored library is not scaled.
+    """
+    import pandas as pd
+
+    unknown = set(ladder or ()) - set(DEFAULT_BITRATE_LADDER)
+    if unknown:
+        raise ValueError(f"Unknown resolution {sorted(unknown)[0]!r} in the bitrate ladder; use one of "
+                         f"{', '.join(DEFAULT_BITRATE_LADDER)}")
+    ladder = {**DEFAULT_BITRATE_LADDER, **(ladder or {})}
+    fields = {**DEFAULT_FIELDS, **(fields or {})}
+    if default_resolution is None:
+        default_resolution = min(ladder, key=_height)
+    if default_resolution not in ladder:
+        raise ValueError(f"Default resolution {default_resolution!r} is not in the bitrate ladder")
+    paths = list(paths)
+    for path in paths:
+        _format(path)
+    input_bytes = sum(os.path.getsize(path) for path in paths)
+    started = time.perf_counter()
+    total = _Aggregate(ladder, default_resolution)
+    done = 0
+
+    def report(path, aggregate):
+        nonlocal done
+        total.merge(aggregate)
+        done += os.path.getsize(path)
+        if log is not None:
+            elapsed = time.perf_counter() - started
+            print(f"{path}: {aggregate.records:,} records ({done / 1e6 / elapsed:,.1f} MB/s)", file=log)
+
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            report(path, _ingest_file(path, fields, ladder, default_resolution))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(min(workers, len(paths))) as pool:
+            futures = {pool.submit(_ingest_file, path, fields, ladder, default_resolution): path for path in paths}
+            for future in concurrent.futures.as_completed(futures):
+                report(futures[future], future.result())
+
+    if total.assets:
+        assets = total.assets[0].to_pandas().rename(columns={'duration': 'duration_minutes'})
+        assets['duration_minutes'] /= 60
+        assets = assets.sort_values('asset_id', ignore_index=True)
+    else:
+        assets = pd.DataFrame({'asset_id': [], 'bytes': [], 'minutes': [], 'duration_minutes': []})
+    logs_duration = bool((assets['duration_minutes'] > 0).any())
+    inputs = calculator_inputs(total.resolutions, total.minutes,
+                               assets['duration_minutes'].sum() if logs_duration else None, period_days)
+    return LogUsage(total.resolutions, total.minutes, total.bytes, assets, inputs, total.records, input_bytes,
+                    time.perf_counter() - started)
+
+
+def _pairs(values, convert=str):
+    pairs = {}
+    for value in values:
+        key, sep, setting = value.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {value!r}")
+        pairs[key] = convert(setting)
+    return pairs
+
+
+def main(argv=None):
+    from pricing.sharing import encode
+    from pricing.totals import quote
+    from pricing.usage import DEFAULT_INPUTS
+
+    parser = argparse.ArgumentParser(description="Derive calculator inputs from CDN delivery or playback logs.")
+    parser.add_argument('logs', nargs='+', help="log files (.jsonl, .ndjson or .csv, optionally .gz)")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes, one file each (default: 1)")
+    parser.add_argument('--ladder', action='append', default=[], metavar='RESOLUTION=MBPS',
+                        help="bitrate of a calculator resolution (repeatable; default: "
+                             + ', '.join(f"{key}={value:g}" for key, value in DEFAULT_BITRATE_LADDER.items()) + ")")
+    parser.add_argument('--field', action='append', default=[], metavar='FIELD=NAME',
+                        help="log field name for bytes, seconds, resolution, asset or duration (repeatable)")
+    parser.add_argument('--default-resolution', help="resolution of deliveries without a readable rendition "
+                                                     "(default: the smallest)")
+    parser.add_argument('--period-days', type=float, help="days the logs cover (default: one month)")
+    parser.add_argument('--assets', help="also write per-asset totals to this CSV")
+    args = parser.parse_args(argv)
+
+    try:
+        result = ingest_logs(args.logs, args.workers, _pairs(args.ladder, float), _pairs(args.field),
+                        args.default_resolution, args.period_days, log=sys.stderr)
+    except (ValueError, argparse.ArgumentTypeError) as exc:
+        parser.error(str(exc))
+    if args.assets:
+        result.assets.to_csv(args.assets, index=False)
+    for resolution, minutes, delivered in zip(result.resolutions, result.minutes, result.bytes):
+        print(f"{resolution:>6s} {minutes:16,.0f} minutes {delivered / 1024 ** 3:14,.1f} GB")
+    inputs = dict(DEFAULT_INPUTS, **result.inputs)
+    print(json.dumps(result.inputs, indent=2))
+    print(f"Monthly spend with Starter Plan: ${quote(inputs).total_spend_developer_plan:,.2f}")
+    print(f"Calculator link parameter: ?s={encode(inputs)}")
+    print(f"Read {result.records:,} records, {result.input_bytes / 1e6:,.1f} MB in {result.seconds:.2f}s "
+          f"({result.input_bytes / 1e6 / max(result.seconds, 1e-9):,.1f} MB/s, "
+          f"{result.records / max(result.seconds, 1e-9):,.0f} records/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
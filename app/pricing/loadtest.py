@@ -0,0 +1,158 @@
+"""Local load test for the quoting service.
+
+    python -m pricing.loadtest --workers 4 --concurrency 16 --requests 5000
+    python -m pricing.loadtest --url http://127.0.0.1:8000 --batch-size 1000
+
+Without ``--url`` a gunicorn server for ``pricing.api:app`` is started on a free
+local port for the duration of the run. Requests are sent from ``--concurrency``
+threads; single quotes go to ``/quote`` and ``--batch-size`` above one sends that
+many seeded random scenarios to ``/quote/batch``. Reports p50/p99 latency and
+requests per second (and scenarios per second for batches) over the requests
+that got a response; requests that failed to connect or read are counted apart.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def random_scenarios(n_scenarios, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    mix = rng.dirichlet(np.ones(4), n_scenarios) * 100
+    lifecycle = rng.dirichlet(np.ones(3), n_scenarios) * 100
+    volumes = rng.lognormal(np.log([5_000, 1_000, 50_000, 50_000]), 1.0, (n_scenarios, 4))
+    return [{
+        'encoding_volume': volume[0], 'live_encoding_volume': volume[1],
+        'streaming_volume': volume[2], 'storage_volume': volume[3],
+        'resolution_mix_720p': shares[0], 'resolution_mix_1080p': shares[1],
+        'resolution_mix_1440p': shares[2], 'resolution_mix_2160p': shares[3],
+        'hot_percent': tiers[0], 'infrequent_percent': tiers[1], 'cold_percent': tiers[2],
+        'baseline_toggle': bool(toggle),
+    } for volume, shares, tiers, toggle in zip(volumes.tolist(), mix.tolist(), lifecycle.tolist(),
+                                               rng.integers(0, 2, n_scenarios).tolist())]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def gunicorn_server(workers, timeout=30):
+    port = _free_port()
+    server = subprocess.Popen(
+        # gunicorn 20.0 has no ``python -m gunicorn``, so call its entry point under this interpreter
+        [sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()', '--chdir', APP_DIR, '--preload',
+         '--workers', str(workers), '--bind', f"127.0.0.1:{port}", '--log-level', 'warning', 'pricing.api:app'])
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                connection.request('GET', '/health')
+                if connection.getresponse().status == 200:
+                    break
+            except OSError:
+                pass
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.1)
+        yield url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(url, n_requests, concurrency, batch_size=1, seed=0, include_sku_spend=True):
+    """Send ``n_requests`` quotes; returns a dict of latency percentiles and throughput."""
+    import numpy as np
+
+    target = urllib.parse.urlsplit(url)
+    scenarios = random_scenarios(batch_size, seed)
+    if batch_size > 1:
+        path, payload = '/quote/batch', json.dumps({'scenarios': scenarios, 'include_sku_spend': include_sku_spend})
+    else:
+        path, payload = '/quote', json.dumps(scenarios[0])
+    headers = {'Content-Type': 'application/json'}
+    # Requests that never get a response stay NaN and are left out of the percentiles
+    latencies = np.full(n_requests, np.nan)
+    counter = iter(range(n_requests))
+    lock = threading.Lock()
+    errors = []
+
+    def client():
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            started = time.perf_counter()
+            try:
+                connection.request('POST', path, payload, headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                # Counted as failed; the next request reconnects
+                connection.close()
+                continue
+            latencies[index] = time.perf_counter() - started
+            if response.status != 200:
+                errors.append(response.status)
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    completed = int(np.count_nonzero(~np.isnan(latencies)))
+    p50, p99 = np.nanpercentile(latencies, [50, 99]) * 1000 if completed else (np.nan, np.nan)
+    return {'requests': n_requests, 'completed': completed, 'failed': n_requests - completed, 'errors': len(errors),
+            'seconds': elapsed, 'p50_ms': p50, 'p99_ms': p99, 'requests_per_second': completed / elapsed,
+            'scenarios_per_second': completed * batch_size / elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the quoting service.")
+    parser.add_argument('--url', help="running service to test (default: start a local gunicorn)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="gunicorn workers when starting a local server (default: CPU count)")
+    parser.add_argument('--requests', type=int, default=2000, help="requests to send (default: 2000)")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads (default: 8)")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help="scenarios per request; above 1 uses /quote/batch (default: 1)")
+    parser.add_argument('--totals-only', action='store_true', help="ask batches for totals without per-SKU spend")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        url = args.url or stack.enter_context(gunicorn_server(args.workers))
+        # Warm up connections and worker caches before measuring
+        run(url, min(args.requests, 4 * args.concurrency), args.concurrency, args.batch_size, args.seed,
+            not args.totals_only)
+        result = run(url, args.requests, args.concurrency, args.batch_size, args.seed, not args.totals_only)
+    print(f"{result['requests']:,} requests in {result['seconds']:.2f}s: "
+          f"{result['requests_per_second']:,.0f} req/s, p50 {result['p50_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, {result['errors']} errors, {result['failed']} failed")
+    if args.batch_size > 1:
+        print(f"{result['scenarios_per_second']:,.0f} scenarios/s")
+
+
+if __name__ == '__main__':
+    main()
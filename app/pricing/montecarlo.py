@@ -0,0 +1,105 @@
+"""Monte Carlo pricing for usage forecasts given as distributions.
+
+Any calculator input may be a plain value or a distribution spec:
+
+    {'dist': 'uniform', 'low': 10_000, 'high': 30_000}
+    {'dist': 'triangular', 'low': 10_000, 'mode': 20_000, 'high': 40_000}
+    {'dist': 'normal', 'mean': 20_000, 'sd': 4_000}          # clipped at 0
+    {'dist': 'lognormal', 'median': 20_000, 'sigma': 0.3}
+
+All samples are drawn from one seeded generator and priced as a single batch. When
+a resolution mix or lifecycle share is random, each sample's shares are rescaled
+to sum to 100 so every sample is a valid configuration.
+"""
+from typing import NamedTuple
+
+PERCENTILES = (10, 50, 90)
+MIX_GROUPS = (
+    ('resolution_mix_720p', 'resolution_mix_1080p', 'resolution_mix_1440p', 'resolution_mix_2160p'),
+    ('hot_percent', 'infrequent_percent', 'cold_percent'),
+)
+
+
+class SimulationResult(NamedTuple):
+    summary: object
+    tier_crossings: object
+    samples: int
+    seed: int
+
+
+def _sample(spec, rng, n_samples):
+    import numpy as np
+
+    dist = spec.get('dist')
+    if dist == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], n_samples)
+    if dist == 'triangular':
+        return rng.triangular(spec['low'], spec['mode'], spec['high'], n_samples)
+    if dist == 'normal':
+        return np.maximum(rng.normal(spec['mean'], spec['sd'], n_samples), 0)
+    if dist == 'lognormal':
+        return spec['median'] * np.exp(spec['sigma'] * rng.standard_normal(n_samples))
+    raise ValueError(f"Unknown distribution {dist!r}; use uniform, triangular, normal or lognormal")
+
+
+def sample_inputs(inputs, n_samples, seed=0):
+    """Replace every distribution spec in ``inputs`` with ``n_samples`` draws."""
+    import numpy as np
+
+    from pricing.usage import DEFAULT_INPUTS
+
+    rng = np.random.default_rng(seed)
+    # Iterate in a fixed order so a seed reproduces the same draws whatever the mapping order
+    sampled = dict(inputs)
+    for key in sorted(key for key, value in inputs.items() if isinstance(value, dict)):
+        sampled[key] = _sample(inputs[key], rng, n_samples)
+    for group in MIX_GROUPS:
+        if any(isinstance(inputs.get(key), dict) for key in group):
+            shares = np.column_stack([np.broadcast_to(sampled.get(key, DEFAULT_INPUTS[key]), (n_samples,))
+                                      for key in group]).astype(np.float64)
+            totals = shares.sum(axis=1, keepdims=True)
+            shares = np.divide(shares * 100, totals, out=np.zeros_like(shares), where=totals > 0)
+            sampled.update(zip(group, shares.T))
+    return sampled
+
+
+def simulate(inputs, n_samples=100_000, seed=0, rate_card=None):
+    """Spend percentiles and tier-crossing probabilities for uncertain ``inputs``.
+
+    ``summary`` has one row per ``calculate_totals`` figure (plus annual spend) and
+    P10/P50/P90 columns. ``tier_crossings`` gives, for every tier above the first,
+    the probability that the SKU's monthly usage reaches that tier.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from pricing.rates import load_rate_card
+    from pricing.totals import calculate_batch_totals
+    from pricing.usage import usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    sampled = sample_inputs(inputs, n_samples, seed)
+    skus, usage = usage_matrix(sampled, n_samples)
+    rows = rate_card.rows(skus)
+    tiers = rate_card.tier_index(rows, usage)
+    totals = calculate_batch_totals(rate_card.spend(rows, usage, tiers), rate_card.categories[rows])
+    totals['annual_spend'] = totals['total_spend_developer_plan'] * 12
+
+    summary = pd.DataFrame(
+        np.percentile(np.array(list(totals.values())), PERCENTILES, axis=1).T,
+        index=list(totals), columns=[f"P{p}" for p in PERCENTILES])
+
+    # Share of samples in each (SKU, tier), accumulated from the top tier down
+    n_tiers = rate_card.start.shape[1]
+    in_tier = np.bincount((tiers + np.arange(len(skus)) * n_tiers).ravel(), minlength=len(skus) * n_tiers)
+    reached = (in_tier.reshape(len(skus), n_tiers)[:, ::-1].cumsum(axis=1)[:, ::-1] / n_samples)[:, 1:]
+    start = rate_card.start[rows][:, 1:]
+    sku_index, tier_index = np.nonzero(np.isfinite(start))
+    tier_crossings = pd.DataFrame({
+        'sku': np.array(skus)[sku_index],
+        'tier': tier_index + 2,
+        'start': start[sku_index, tier_index],
+        'probability': reached[sku_index, tier_index],
+    })
+    return SimulationResult(summary, tier_crossings, n_samples, seed)
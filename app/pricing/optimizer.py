@@ -0,0 +1,179 @@
+"""Search resolution mix, storage lifecycle and baseline tier for the cheapest configuration.
+
+Candidates are every split of the resolution mix and of the hot/infrequent/cold
+lifecycle in ``step`` percent increments, with and without the baseline tier,
+filtered by the caller's bounds. The baseline tier is only offered for mixes
+whose resolutions all have baseline SKUs (720p and 1080p in ``sku_drivers.csv``);
+with it, any other resolution would be neither encoded nor stored. Volumes stay
+as given. Savings are against the configuration in the inputs with its
+resolution mix and lifecycle scaled to sum to 100.
+
+Pricing every candidate exactly is avoided with a bound from the piecewise-linear
+tier spend: each SKU's spend is at least ``u * r`` where ``r`` is the SKU's lowest
+average rate over all usage (reached at a tier edge). That bound is one matrix
+product per candidate, so candidates are ranked by it and priced exactly in that
+order until the next bound exceeds the ``top``-th best exact spend found so far.
+"""
+import itertools
+from typing import NamedTuple
+
+LIFECYCLE_INPUTS = ('hot_percent', 'infrequent_percent', 'cold_percent')
+
+
+class OptimizationResult(NamedTuple):
+    options: object
+    current_spend: float
+    candidates: int
+    evaluated: int
+
+
+def _compositions(parts, step):
+    """Every way to split 100 into ``parts`` non-negative multiples of ``step``."""
+    import numpy as np
+
+    slots = 100 // step
+    splits = []
+    for bars in itertools.combinations(range(slots + parts - 1), parts - 1):
+        edges = (-1,) + bars + (slots + parts - 1,)
+        splits.append([edges[i + 1] - edges[i] - 1 for i in range(parts)])
+    return np.array(splits, dtype=np.float64) * step
+
+
+def min_average_rate(rate_card, rows):
+    """Lowest ``spend(u) / u`` over ``u > 0`` for each rate card row."""
+    import numpy as np
+
+    start = rate_card.start[rows]
+    price = rate_card.price[rows]
+    previous_tier_max_spend = rate_card.previous_tier_max_spend[rows]
+    end = np.minimum(np.concatenate([start[:, 1:], np.full((len(rows), 1), np.inf)], axis=1),
+                     rate_card.end[rows][:, None])
+    real = np.isfinite(start)
+    # Within a tier spend / u is monotone, so its extremes sit at the tier edges
+    with np.errstate(divide='ignore', invalid='ignore'):
+        at_start = np.where(real & (start > 0), previous_tier_max_spend / start, np.inf)
+        at_end = np.where(real, (previous_tier_max_spend + (end - start) * price) / end, np.inf)
+    first_tier = price[:, 0]
+    return np.minimum(first_tier, np.minimum(at_start.min(axis=1), at_end.min(axis=1)))
+
+
+def baseline_resolutions(drivers):
+    """Resolutions that have baseline-tier SKUs in the driver table."""
+    from pricing.usage import ENCODING_TIERS
+
+    ones = len(drivers.volume_inputs) + len(drivers.resolutions)
+    baseline = drivers.encoding_tier == ones + ENCODING_TIERS.index('baseline')
+    return tuple(resolution for i, resolution in enumerate(drivers.resolutions)
+                 if (drivers.resolution[baseline] == len(drivers.volume_inputs) + i).any())
+
+
+def candidate_configurations(resolutions, constraints=None, step=5, baseline=None):
+    """Candidate inputs as a dict of equal-length arrays, filtered by ``constraints``.
+
+    ``constraints`` maps an input name to ``(low, high)`` bounds (either may be None),
+    e.g. ``{'resolution_mix_1080p': (30, None), 'cold_percent': (None, 50)}``;
+    ``baseline_toggle`` bounds use 0/1. When ``baseline`` lists the resolutions the
+    baseline tier covers, baseline candidates with a share of any other are dropped.
+    """
+    import numpy as np
+
+    if 100 % step:
+        raise ValueError("step must divide 100")
+    mix_keys = tuple(f"resolution_mix_{resolution}" for resolution in resolutions)
+    mixes = _compositions(len(mix_keys), step)
+    lifecycles = _compositions(len(LIFECYCLE_INPUTS), step)
+    toggles = np.array([0.0, 1.0])
+    keep = {}
+    for key, values in [*zip(mix_keys, mixes.T), *zip(LIFECYCLE_INPUTS, lifecycles.T), ('baseline_toggle', toggles)]:
+        low, high = (constraints or {}).get(key, (None, None))
+        keep[key] = np.ones(len(values), dtype=bool)
+        if low is not None:
+            keep[key] &= values >= low
+        if high is not None:
+            keep[key] &= values <= high
+    mixes = mixes[np.logical_and.reduce([keep[key] for key in mix_keys])]
+    lifecycles = lifecycles[np.logical_and.reduce([keep[key] for key in LIFECYCLE_INPUTS])]
+    toggles = toggles[keep['baseline_toggle']]
+
+    mix_index, lifecycle_index, toggle_index = (
+        index.ravel() for index in np.meshgrid(np.arange(len(mixes)), np.arange(len(lifecycles)),
+                                               np.arange(len(toggles)), indexing='ij'))
+    candidates = {key: mixes[mix_index, i] for i, key in enumerate(mix_keys)}
+    candidates.update({key: lifecycles[lifecycle_index, i] for i, key in enumerate(LIFECYCLE_INPUTS)})
+    candidates['baseline_toggle'] = toggles[toggle_index] == 1
+    if baseline is not None:
+        uncovered = sum(candidates[f"resolution_mix_{resolution}"] for resolution in resolutions
+                        if resolution not in baseline)
+        possible = ~candidates['baseline_toggle'] | (uncovered == 0)
+        candidates = {key: values[possible] for key, values in candidates.items()}
+    return candidates
+
+
+def _scaled_to_100(inputs, keys):
+    """``inputs`` with the ``keys`` shares scaled to sum to 100, or None if they sum to 0."""
+    from pricing.usage import DEFAULT_INPUTS
+
+    shares = {key: float(inputs.get(key, DEFAULT_INPUTS.get(key, 0))) for key in keys}
+    total = sum(shares.values())
+    if total <= 0:
+        return None
+    return {**inputs, **{key: share * 100 / total for key, share in shares.items()}}
+
+
+def optimize(inputs=None, constraints=None, step=5, top=5, rate_card=None, chunk_size=50_000, exact_chunk_size=4096):
+    """Cheapest configurations for the volumes in ``inputs``; see ``candidate_configurations``.
+
+    Returns an ``OptimizationResult`` whose ``options`` DataFrame lists the ``top``
+    configurations with their Starter Plan monthly spend and savings against the
+    configuration in ``inputs`` (NaN when its resolution mix or lifecycle is all 0).
+    """
+    import numpy as np
+    import pandas as pd
+
+    from pricing.rates import load_rate_card
+    from pricing.totals import STARTER_PLAN_COST, STARTER_PLAN_CREDIT, quote
+    from pricing.usage import load_sku_drivers, usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    inputs = dict(inputs or {})
+    drivers = load_sku_drivers()
+    candidates = candidate_configurations(drivers.resolutions, constraints, step, baseline_resolutions(drivers))
+    n_candidates = len(candidates['baseline_toggle'])
+    current = _scaled_to_100(inputs, [f"resolution_mix_{resolution}" for resolution in drivers.resolutions])
+    current = current and _scaled_to_100(current, LIFECYCLE_INPUTS)
+    current_spend = quote(current, rate_card).total_spend_developer_plan if current else float('nan')
+    if not n_candidates:
+        return OptimizationResult(pd.DataFrame(), current_spend, 0, 0)
+
+    rows = rate_card.rows(drivers.skus)
+    rates = min_average_rate(rate_card, rows)
+
+    def chunk_usage(index):
+        chunk = {key: values[index] for key, values in candidates.items()}
+        return usage_matrix({**inputs, **chunk}, len(index), drivers)[1]
+
+    bounds = np.empty(n_candidates)
+    for begin in range(0, n_candidates, chunk_size):
+        index = np.arange(begin, min(begin + chunk_size, n_candidates))
+        bounds[index] = chunk_usage(index) @ rates
+
+    order = np.argsort(bounds, kind='stable')
+    best_index = np.empty(0, dtype=np.intp)
+    best_spend = np.empty(0)
+    evaluated = 0
+    for begin in range(0, n_candidates, exact_chunk_size):
+        index = order[begin:begin + exact_chunk_size]
+        if len(best_spend) >= top and bounds[index[0]] > best_spend[-1]:
+            break
+        spend = rate_card.spend(rows, chunk_usage(index)).sum(axis=1)
+        evaluated += len(index)
+        best_index = np.concatenate([best_index, index])
+        best_spend = np.concatenate([best_spend, spend])
+        keep = np.argsort(best_spend, kind='stable')[:top]
+        best_index, best_spend = best_index[keep], best_spend[keep]
+
+    options = pd.DataFrame({key: values[best_index] for key, values in candidates.items()})
+    options['total_spend_developer_plan'] = np.maximum(best_spend - STARTER_PLAN_CREDIT, STARTER_PLAN_COST)
+    options['savings'] = current_spend - options['total_spend_developer_plan']
+    return OptimizationResult(options, current_spend, n_candidates, evaluated)
@@ -0,0 +1,174 @@
+"""Portfolio pricing for resellers with many sub-accounts.
+
+    python -m pricing.portfolio accounts.csv bills.csv --pool-column contract --plan pool
+
+Each account's usage is derived as in the calculator. Accounts that share a pool
+have their SKU usage summed and tiered together, and every pool's spend on a SKU
+is allocated back to its accounts in proportion to their usage of that SKU.
+Accounts without a pool (a missing label) are tiered on their own. The Starter
+Plan credit and floor apply either to each account (``plan='account'``) or once
+per pool (``plan='pool'``), in which case a pool's plan adjustments are split
+between its accounts by their share of the pool's usage spend (equally if the
+pool has none).
+
+A pool's ``pooling_savings`` is what pooled tiers save under the chosen plan:
+its accounts' unpooled usage spend with the plan applied the same way, less the
+pool's bill. ``plan_savings`` is the rest of the difference to the accounts'
+standalone bills, i.e. what applying the plan once per pool instead of once per
+account saves (negative when the pool gets one credit where its accounts would
+get one each).
+
+Pools are summed with one sort and ``reduceat`` and priced as a single (pools x
+SKUs) batch, so the cost grows with the number of accounts, not with the number
+of pools or their sizes.
+"""
+import argparse
+import sys
+from typing import NamedTuple
+
+import numpy as np
+
+PLANS = ('account', 'pool')
+
+
+class PortfolioResult(NamedTuple):
+    accounts: object
+    pools: object
+    skus: list
+    sku_spend: object
+
+
+def pool_codes(pools, n_accounts):
+    """Pool index of each account and the pool labels; accounts without a label get a pool of their own."""
+    import pandas as pd
+
+    if pools is None:
+        return np.arange(n_accounts), np.full(n_accounts, None, dtype=object)
+    codes, labels = pd.factorize(np.asarray(pools, dtype=object), use_na_sentinel=True)
+    alone = codes < 0
+    labels = np.concatenate([np.asarray(labels, dtype=object), np.full(alone.sum(), None, dtype=object)])
+    codes[alone] = len(labels) - alone.sum() + np.arange(alone.sum())
+    return codes, labels
+
+
+def _split(values, weights, codes, n_pools):
+    """Split each pool's ``values`` between its accounts by ``weights`` (equally when a pool's weights are 0)."""
+    pool_weights = np.bincount(codes, weights, minlength=n_pools)
+    pool_sizes = np.bincount(codes, minlength=n_pools)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(pool_weights[codes] > 0, weights / pool_weights[codes], 1 / pool_sizes[codes])
+    return values[codes] * share
+
+
+def price_portfolio(accounts, pools=None, plan='account', rate_card=None, include_sku_spend=False):
+    """Bill every account of a portfolio.
+
+    ``accounts`` holds length-N calculator input columns (a DataFrame or a dict of
+    arrays); ``pools`` is a length-N array of pool labels or the name of a column
+    of ``accounts``. ``accounts`` of the result has one row per account with its
+    allocated category spend, ``calculate_totals`` figures and
+    ``standalone_spend_developer_plan``, its bill if it were priced alone.
+    ``pools`` sums them per pool. ``sku_spend`` is the allocated (N x SKUs) spend
+    when ``include_sku_spend`` is set.
+    """
+    import pandas as pd
+
+    from pricing.rates import load_rate_card
+    from pricing.totals import STARTER_PLAN_COST, calculate_batch_totals
+    from pricing.usage import usage_matrix
+
+    if plan not in PLANS:
+        raise ValueError(f"Unknown plan {plan!r}; use one of {', '.join(PLANS)}")
+    if rate_card is None:
+        rate_card = load_rate_card()
+    if isinstance(pools, str):
+        pools = accounts[pools]
+    n_accounts = len(next(iter(accounts.values()))) if isinstance(accounts, dict) else len(accounts)
+    codes, labels = pool_codes(pools, n_accounts)
+    n_pools = len(labels)
+
+    skus, usage = usage_matrix(accounts, n_accounts)
+    usage = np.ascontiguousarray(usage)
+    rows = rate_card.rows(skus)
+    categories = rate_card.categories[rows]
+
+    # Sum each pool's usage: sort accounts by pool, then reduce the contiguous runs.
+    # Every code in 0..n_pools-1 has an account, so run i is pool i.
+    order = np.argsort(codes, kind='stable')
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    pool_usage = np.add.reduceat(usage[order], starts, axis=0)
+    pool_spend = rate_card.spend(rows, pool_usage)
+
+    # Each account pays the pool's spend on a SKU in proportion to its usage of it
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sku_spend = np.where(pool_usage[codes] > 0, pool_spend[codes] * (usage / pool_usage[codes]), 0)
+    account_totals = calculate_batch_totals(sku_spend, categories)
+    standalone_spend = rate_card.spend(rows, usage)
+    standalone = calculate_batch_totals(standalone_spend, categories)
+
+    if plan == 'pool':
+        pool_totals = calculate_batch_totals(pool_spend, categories)
+        usage_spend = sku_spend.sum(axis=1)
+        for name in ('total_spend', 'mux_credits', 'total_spend_developer_plan'):
+            account_totals[name] = _split(pool_totals[name], usage_spend, codes, n_pools)
+        developer_plan_cost = STARTER_PLAN_COST / np.bincount(codes, minlength=n_pools)[codes]
+        unpooled = calculate_batch_totals(np.add.reduceat(standalone_spend[order], starts, axis=0),
+                                          categories)['total_spend_developer_plan']
+    else:
+        developer_plan_cost = STARTER_PLAN_COST
+        unpooled = np.bincount(codes, standalone['total_spend_developer_plan'], minlength=n_pools)
+
+    account_df = pd.DataFrame({
+        'pool': labels[codes],
+        **account_totals,
+        'developer_plan_cost': developer_plan_cost,
+        'standalone_spend_developer_plan': standalone['total_spend_developer_plan'],
+    })
+    pool_df = account_df.drop(columns='pool').groupby(codes).sum()
+    pool_df.insert(0, 'accounts', np.bincount(codes, minlength=n_pools))
+    pool_df.insert(0, 'pool', labels)
+    pool_df['pooling_savings'] = unpooled - pool_df['total_spend_developer_plan'].to_numpy()
+    pool_df['plan_savings'] = pool_df['standalone_spend_developer_plan'].to_numpy() - unpooled
+    return PortfolioResult(account_df, pool_df.reset_index(drop=True), skus, sku_spend if include_sku_spend else None)
+
+
+def main(argv=None):
+    import time
+
+    import pandas as pd
+
+    from pricing.bulk import ChunkWriter, read_chunks, usage_inputs
+    from pricing.usage import PRICING_COLUMNS
+
+    parser = argparse.ArgumentParser(description="Bill the accounts of a portfolio with pooled volume tiers.")
+    parser.add_argument('input', help="one usage record per account (.csv, .csv.gz or .parquet)")
+    parser.add_argument('output', help="account bills to write (.csv or .parquet)")
+    parser.add_argument('--pool-column', default='pool',
+                        help="column naming each account's pool; empty means tiered alone (default: pool)")
+    parser.add_argument('--plan', choices=PLANS, default='account',
+                        help="apply the Starter Plan per account or per pool (default: account)")
+    parser.add_argument('--pools-output', help="also write the per-pool totals here")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    records = pd.concat(read_chunks(args.input, 1_000_000), ignore_index=True)
+    if args.pool_column not in records:
+        parser.error(f"{args.input} has no {args.pool_column!r} column")
+    result = price_portfolio(usage_inputs(records), records[args.pool_column].to_numpy(), args.plan)
+    passthrough = records.drop(columns=[column for column in records
+                                        if column in PRICING_COLUMNS or column == args.pool_column])
+    outputs = [(args.output, pd.concat([passthrough, result.accounts], axis=1))]
+    if args.pools_output:
+        outputs.append((args.pools_output, result.pools))
+    for path, frame in outputs:
+        writer = ChunkWriter(path)
+        try:
+            writer.write(frame)
+        finally:
+            writer.close()
+    print(f"Billed {len(records):,} accounts in {len(result.pools):,} pools in "
+          f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Multi-month spend projections with a growing, ageing storage library.
+
+Encoding, live and streaming volumes grow by ``<volume>_growth`` percent a month.
+Every month's on-demand minutes join the stored library, and each monthly cohort
+moves through the storage lifecycle by age: hot for ``hot_months``, then
+infrequent for ``infrequent_months``, then cold. The starting library
+(``storage_volume``) enters with its current hot/infrequent/cold split and ages on
+the same schedule. Each month is priced with the existing storage SKUs through
+the lifecycle shares, so the baseline toggle and resolution mix apply as usual.
+
+All months (and all customers of a batch) are computed with cumulative sums and
+priced as one batch; there is no per-month loop.
+"""
+PROJECTION_DEFAULTS = {
+    'encoding_volume_growth': 0,
+    'live_encoding_volume_growth': 0,
+    'streaming_volume_growth': 0,
+    'hot_months': 1,
+    'infrequent_months': 2,
+}
+GROWING_VOLUMES = ('encoding_volume', 'live_encoding_volume', 'streaming_volume')
+PROJECTED_INPUTS = GROWING_VOLUMES + ('storage_volume', 'hot_percent', 'infrequent_percent', 'cold_percent')
+
+
+def _column(inputs, key, n_customers):
+    import numpy as np
+
+    from pricing.usage import DEFAULT_INPUTS
+
+    value = inputs.get(key, PROJECTION_DEFAULTS.get(key, DEFAULT_INPUTS.get(key, 0)))
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n_customers,))[:, None]
+
+
+def projection_inputs(inputs, months, n_customers=1):
+    """Per-month calculator inputs as ``(n_customers, months)`` arrays."""
+    import numpy as np
+
+    month = np.arange(months)
+    projected = {}
+    for key in GROWING_VOLUMES:
+        growth = _column(inputs, f"{key}_growth", n_customers)
+        projected[key] = _column(inputs, key, n_customers) * (1 + growth / 100) ** month
+
+    hot_months = _column(inputs, 'hot_months', n_customers).astype(np.intp)
+    cold_after = hot_months + _column(inputs, 'infrequent_months', n_customers).astype(np.intp)
+    # encoded[:, m] holds the minutes encoded in months < m, so a window of cohorts is a difference
+    encoded = np.concatenate([np.zeros((n_customers, 1)), projected['encoding_volume'].cumsum(axis=1)], axis=1)
+
+    def encoded_before(lag):
+        return np.take_along_axis(encoded, np.clip(month + 1 - lag, 0, None), axis=1)
+
+    library = _column(inputs, 'storage_volume', n_customers)
+    shares = {key: _column(inputs, key, n_customers) / 100
+              for key in ('hot_percent', 'infrequent_percent', 'cold_percent')}
+    initial_hot = library * shares['hot_percent']
+    initial_infrequent = library * shares['infrequent_percent']
+    initial_cold = library * shares['cold_percent']
+    infrequent_months = cold_after - hot_months
+
+    hot = (encoded[:, 1:] - encoded_before(hot_months)) + initial_hot * (month < hot_months)
+    infrequent = (encoded_before(hot_months) - encoded_before(cold_after)
+                  + initial_hot * ((month >= hot_months) & (month < cold_after))
+                  + initial_infrequent * (month < infrequent_months))
+    cold = (encoded_before(cold_after) + initial_cold + initial_hot * (month >= cold_after)
+            + initial_infrequent * (month >= infrequent_months))
+
+    storage = hot + infrequent + cold
+    projected['storage_volume'] = storage
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for key, stored in (('hot_percent', hot), ('infrequent_percent', infrequent), ('cold_percent', cold)):
+            projected[key] = np.where(storage > 0, stored / storage * 100, 0)
+    return projected
+
+
+def project_batch(inputs, months=12, n_customers=1, rate_card=None, chunk_size=10_000):
+    """Project ``n_customers`` at once; returns a dict of ``(n_customers, months)`` arrays.
+
+    ``inputs`` values may be scalars or length-``n_customers`` arrays. The result has
+    the per-month volumes and lifecycle shares, the ``calculate_totals`` figures and
+    ``cumulative_spend`` (running total of the Starter Plan bill). Customers are
+    priced ``chunk_size`` at a time to bound memory.
+    """
+    import numpy as np
+
+    from pricing.rates import load_rate_card
+    from pricing.totals import calculate_batch_totals
+    from pricing.usage import factor_inputs, load_sku_drivers, usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    inputs = dict(inputs)
+    result = projection_inputs(inputs, months, n_customers)
+    drivers = load_sku_drivers()
+    rows = rate_card.rows(drivers.skus)
+    categories = rate_card.categories[rows]
+    # Only what usage_matrix reads: callers may pass the whole session state
+    read = [key for key in dict.fromkeys(factor_inputs(drivers)) if key in inputs and key not in PROJECTED_INPUTS]
+    for begin in range(0, n_customers, chunk_size):
+        chunk = slice(begin, min(begin + chunk_size, n_customers))
+        n_chunk = chunk.stop - chunk.start
+        flat = {}
+        for key in read:
+            value = np.asarray(inputs[key])
+            flat[key] = np.repeat(value[chunk], months) if value.ndim else value
+        flat.update({key: result[key][chunk].ravel() for key in PROJECTED_INPUTS})
+        usage = usage_matrix(flat, n_chunk * months, drivers)[1]
+        totals = calculate_batch_totals(rate_card.spend(rows, usage), categories)
+        for key, value in totals.items():
+            result.setdefault(key, np.empty((n_customers, months)))[chunk] = value.reshape(n_chunk, months)
+    result['cumulative_spend'] = result['total_spend_developer_plan'].cumsum(axis=1)
+    return result
+
+
+def project(inputs=None, months=12, rate_card=None):
+    """Month-by-month projection for one set of calculator inputs as a DataFrame."""
+    import numpy as np
+    import pandas as pd
+
+    result = project_batch(dict(inputs or {}), months, 1, rate_card)
+    return pd.DataFrame({'month': np.arange(1, months + 1), **{key: value[0] for key, value in result.items()}})
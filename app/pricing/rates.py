@@ -0,0 +1,341 @@
+"""Rate card loading.
+
+``rates.csv`` is validated and compiled once into a directory of ``.npy`` arrays
+named after the CSV's content hash. Every process then memory-maps the same
+artifact instead of re-parsing the CSV, so workers share the pages and pandas is
+not needed to quote. A missing, stale or corrupt artifact is rebuilt on load.
+
+``rates.csv`` is the current rate card; other versions live next to it as
+``rate_cards/<name>.csv`` (a date or a label) and are loaded by name. Each loaded
+file is watched: ``load_rate_card`` stats it at most every
+``MUX_PRICING_RELOAD_INTERVAL`` seconds and, when the contents change, compiles
+the new version and swaps it in, so running servers pick up a price change
+without a restart. Callbacks registered with ``on_rate_card_change`` run after
+each swap (e.g. to evict cached quotes of the old version).
+
+    python -m pricing.rates [path/to/rates.csv] [--strict]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+RATES_PATH = os.path.join(DATA_DIR, 'rates.csv')
+COMPILED_DIR = os.environ.get('MUX_PRICING_COMPILED_DIR', os.path.join(DATA_DIR, 'compiled'))
+RATE_CARDS_DIR = os.environ.get('MUX_PRICING_RATE_CARDS_DIR', os.path.join(DATA_DIR, 'rate_cards'))
+RELOAD_INTERVAL = float(os.environ.get('MUX_PRICING_RELOAD_INTERVAL', 2.0))
+CURRENT_VERSION = 'current'
+
+ARTIFACT_VERSION = 1
+ARTIFACT_ARRAYS = ('start', 'end', 'price', 'previous_tier_max_spend')
+OPEN_ENDED = 1e12
+REQUIRED_COLUMNS = ('sku_category', 'unique_key', 'start', 'end', 'price', 'previous_tier_max_spend')
+
+
+class RateCardError(ValueError):
+    pass
+
+
+class RateCardWarning(UserWarning):
+    pass
+
+
+def load_pricing_csv(file_path=RATES_PATH):
+    import pandas as pd
+
+    return pd.read_csv(file_path)
+
+
+def content_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def artifact_path(file_path, digest):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(COMPILED_DIR, f"{stem}-v{ARTIFACT_VERSION}-{digest[:16]}")
+
+
+def validate_rate_card(pricing_tiers, spend_tolerance=1.0):
+    """Check tier structure; returns ``(errors, drift)`` lists of messages.
+
+    Errors are structural problems that would leave some usage without a tier.
+    Drift lists ``previous_tier_max_spend`` values that differ from the cumulative
+    spend of the earlier tiers by more than ``spend_tolerance`` dollars.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in pricing_tiers]
+    if missing:
+        return [f"missing columns: {', '.join(missing)}"], []
+    errors = []
+    drift = []
+    for key, tiers in pricing_tiers.sort_values(['unique_key', 'start'], kind='stable').groupby('unique_key'):
+        start = tiers['start'].to_numpy(dtype=float)
+        end = tiers['end'].to_numpy(dtype=float)
+        price = tiers['price'].to_numpy(dtype=float)
+        previous_tier_max_spend = tiers['previous_tier_max_spend'].to_numpy(dtype=float)
+        if tiers[list(REQUIRED_COLUMNS)].isna().any().any():
+            errors.append(f"{key}: tier rows have empty values")
+            continue
+        if tiers['sku_category'].nunique() != 1:
+            errors.append(f"{key}: tiers span several SKU categories")
+        if start[0] != 0:
+            errors.append(f"{key}: first tier starts at {start[0]:g} instead of 0")
+        if (end <= start).any():
+            errors.append(f"{key}: tier with end <= start")
+        gaps = start[1:] != end[:-1]
+        if gaps.any():
+            errors.append(f"{key}: tiers are not contiguous at start {start[1:][gaps][0]:g}")
+        if end[-1] < OPEN_ENDED:
+            errors.append(f"{key}: last tier ends at {end[-1]:g}; it must be open-ended (>= {OPEN_ENDED:g})")
+        if (price < 0).any():
+            errors.append(f"{key}: negative price")
+        expected = [0.0]
+        for tier_start, tier_end, tier_price in zip(start[:-1], end[:-1], price[:-1]):
+            expected.append(expected[-1] + (tier_end - tier_start) * tier_price)
+        for tier, (actual, wanted) in enumerate(zip(previous_tier_max_spend, expected), start=1):
+            if abs(actual - wanted) > spend_tolerance:
+                drift.append(f"{key} tier {tier}: previous_tier_max_spend is {actual:g}, "
+                             f"cumulative spend of earlier tiers is {wanted:g}")
+    return errors, drift
+
+
+def _array_digest(array):
+    return hashlib.sha256(memoryview(array).cast('B')).hexdigest()
+
+
+def build_artifact(file_path=RATES_PATH, strict=False):
+    """Validate ``file_path`` and write its compiled artifact; returns the artifact directory."""
+    import numpy as np
+
+    from pricing.engine import RateCard
+
+    digest = content_hash(file_path)
+    pricing_tiers = load_pricing_csv(file_path)
+    errors, drift = validate_rate_card(pricing_tiers)
+    if strict:
+        errors += drift
+    if errors:
+        raise RateCardError(f"{file_path} is not a valid rate card:\n  " + "\n  ".join(errors))
+    if drift:
+        # One summary per build rather than a line per tier from every process
+        warnings.warn(f"{file_path}: previous_tier_max_spend of {len(drift)} tier(s) differs from the cumulative "
+                      f"spend of the earlier tiers (e.g. {drift[0]}); run `python -m pricing.rates --strict` to "
+                      f"list them", RateCardWarning, stacklevel=2)
+
+    rate_card = RateCard.from_frame(pricing_tiers)
+    target = artifact_path(file_path, digest)
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.building-', dir=COMPILED_DIR)
+    try:
+        meta = {
+            'version': ARTIFACT_VERSION,
+            'source_sha256': digest,
+            'keys': list(rate_card.keys),
+            'categories': list(rate_card.categories),
+            'arrays': {},
+        }
+        for name in ARTIFACT_ARRAYS:
+            array = np.ascontiguousarray(getattr(rate_card, name), dtype=np.float64)
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+            meta['arrays'][name] = {'shape': list(array.shape), 'sha256': _array_digest(array)}
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        # mkdtemp creates the directory 0700; workers may run as another user than the builder
+        os.chmod(staging, 0o755)
+        # Publish atomically. Another process may have published the same content
+        # first; only a previous build that no longer loads is replaced.
+        if os.path.isdir(target):
+            try:
+                load_artifact(target, digest)
+                return target
+            except RateCardError:
+                shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            if not os.path.isdir(target):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def load_artifact(path, digest=None):
+    """Memory-map a compiled artifact, raising ``RateCardError`` if it is stale or corrupt."""
+    import numpy as np
+
+    from pricing.engine import RateCard
+
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != ARTIFACT_VERSION or (digest is not None and meta['source_sha256'] != digest):
+            raise RateCardError(f"{path} is stale")
+        arrays = {}
+        for name in ARTIFACT_ARRAYS:
+            array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+            expected = meta['arrays'][name]
+            if list(array.shape) != expected['shape'] or _array_digest(array) != expected['sha256']:
+                raise RateCardError(f"{path}/{name}.npy is corrupt")
+            arrays[name] = array
+        return RateCard(meta['keys'], meta['categories'], **arrays, version=meta['source_sha256'])
+    except (OSError, KeyError, TypeError, ValueError) as exc:
+        if isinstance(exc, RateCardError):
+            raise
+        raise RateCardError(f"{path} is unreadable: {exc}") from exc
+
+
+def rate_card_versions():
+    """Map each rate card version name to its CSV: ``current`` is ``rates.csv``, then ``rate_cards/*.csv``."""
+    versions = {CURRENT_VERSION: RATES_PATH}
+    if os.path.isdir(RATE_CARDS_DIR):
+        for name in sorted(os.listdir(RATE_CARDS_DIR)):
+            stem, extension = os.path.splitext(name)
+            if extension == '.csv' and stem != CURRENT_VERSION:
+                versions[stem] = os.path.join(RATE_CARDS_DIR, name)
+    return versions
+
+
+def rate_card_path(version):
+    """CSV path of a version name from ``rate_card_versions``, or ``version`` itself if it is a file."""
+    versions = rate_card_versions()
+    if version in versions:
+        return versions[version]
+    if os.path.isfile(version):
+        return version
+    raise RateCardError(f"Unknown rate card version {version!r}; known versions: {', '.join(versions)}")
+
+
+def compile_rate_card(file_path=RATES_PATH, digest=None):
+    """Memory-map the compiled artifact of ``file_path``, building it first if needed."""
+    if digest is None:
+        digest = content_hash(file_path)
+    path = artifact_path(file_path, digest)
+    try:
+        return load_artifact(path, digest)
+    except RateCardError:
+        pass
+    try:
+        path = build_artifact(file_path)
+    except OSError:
+        path = None
+    if path is not None:
+        try:
+            return load_artifact(path, digest)
+        except RateCardError:
+            pass
+    # Read-only deployment, or an artifact another user published that this one
+    # cannot read: validate and compile in memory instead
+    from pricing.engine import RateCard
+
+    pricing_tiers = load_pricing_csv(file_path)
+    errors, _ = validate_rate_card(pricing_tiers)
+    if errors:
+        raise RateCardError(f"{file_path} is not a valid rate card:\n  " + "\n  ".join(errors))
+    rate_card = RateCard.from_frame(pricing_tiers)
+    rate_card.version = digest
+    return rate_card
+
+
+_listeners = []
+
+
+def on_rate_card_change(callback):
+    """Call ``callback(old, new)`` after any watched rate card is swapped for a new version."""
+    _listeners.append(callback)
+    return callback
+
+
+class RateCardWatcher:
+    """The compiled rate card of one CSV, recompiled and swapped in when the file changes.
+
+    ``current`` stats the file at most once per ``interval`` seconds. A changed file
+    is hashed and compiled on the calling thread (other threads keep getting the
+    old card meanwhile), then published with a single reference assignment, so a
+    reader sees either the old card or the new one. A new file that fails to
+    parse or validate is reported as a ``RateCardWarning`` and the old card stays.
+    """
+
+    def __init__(self, file_path=RATES_PATH, interval=RELOAD_INTERVAL):
+        self.file_path = file_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._signature = self._stat()
+        self._rate_card = compile_rate_card(file_path)
+        self._checked = time.monotonic()
+
+    def _stat(self):
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def current(self):
+        if time.monotonic() - self._checked >= self.interval and self._lock.acquire(blocking=False):
+            try:
+                self.reload()
+            finally:
+                self._lock.release()
+        return self._rate_card
+
+    def reload(self):
+        """Swap in the file's current contents if they changed; returns True on a swap."""
+        self._checked = time.monotonic()
+        old = self._rate_card
+        try:
+            signature = self._stat()
+            if signature == self._signature:
+                return False
+            digest = content_hash(self.file_path)
+            new = old if digest == old.version else compile_rate_card(self.file_path, digest)
+        except (OSError, RateCardError) as exc:
+            # Typically a half-written file; the next check retries
+            warnings.warn(f"Keeping rate card {old.version[:12]} for {self.file_path}: {exc}", RateCardWarning,
+                          stacklevel=2)
+            return False
+        self._signature = signature
+        if new is old:
+            return False
+        self._rate_card = new
+        for callback in list(_listeners):
+            callback(old, new)
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def rate_card_watcher(file_path=RATES_PATH):
+    return RateCardWatcher(file_path)
+
+
+def load_rate_card(file_path=RATES_PATH):
+    """The current compiled rate card of ``file_path``, reloaded when the file changes."""
+    return rate_card_watcher(file_path).current()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a rate card and compile its memory-mappable artifact.")
+    parser.add_argument('csv', nargs='?', default=RATES_PATH, help="rate card CSV (default: app/data/rates.csv)")
+    parser.add_argument('--strict', action='store_true',
+                        help="treat previous_tier_max_spend drift as an error")
+    args = parser.parse_args(argv)
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', RateCardWarning)
+            path = build_artifact(args.csv, strict=args.strict)
+    except RateCardError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    for warning in caught:
+        print(f"warning: {warning.message}", file=sys.stderr)
+    print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
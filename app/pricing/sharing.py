@@ -0,0 +1,210 @@
+"""Compact share tokens for calculator inputs, and an optional short-link store.
+
+A token is URL-safe base64 (unpadded) of::
+
+    version byte | varint bitmask of fields that differ from the schema default | values
+
+Each schema version is an append-only list of ``(name, kind, default)`` frozen at
+release: fields and defaults are never edited in place, a change adds a new
+version. Decoding uses the token's own schema, so links stay lossless across app
+versions; fields the old schema lacks fall back to today's defaults. Numbers keep
+their exact type: an int is a zig-zag varint and a float its IEEE-754 bytes, with
+the low bit of a leading varint telling them apart.
+
+``ShortLinkStore`` maps short ids to tokens in a local SQLite file, keyed by a
+primary-key index so a lookup is one B-tree probe.
+"""
+import base64
+import contextlib
+import functools
+import hashlib
+import os
+import sqlite3
+import struct
+import time
+
+SCHEMAS = {
+    1: (
+        ('encoding_volume', 'number', 1000),
+        ('live_encoding_volume', 'number', 500),
+        ('storage_volume', 'number', 6000),
+        ('streaming_volume', 'number', 20000),
+        ('percent_baseline', 'number', 100),
+        ('cold_percent', 'number', 60),
+        ('infrequent_percent', 'number', 10),
+        ('hot_percent', 'number', 30),
+        ('resolution_mix_720p', 'number', 100),
+        ('resolution_mix_1080p', 'number', 0),
+        ('resolution_mix_1440p', 'number', 0),
+        ('resolution_mix_2160p', 'number', 0),
+        ('bandwidth_gb', 'number', 100),
+        ('bandwidth_bitrate', 'number', 3.5),
+        ('library_size_gb', 'number', 100),
+        ('baseline_toggle', 'bool', False),
+    ),
+}
+CURRENT_VERSION = max(SCHEMAS)
+SHORT_LINKS_PATH = os.environ.get('MUX_PRICING_SHORT_LINKS') or None
+
+
+class ShareTokenError(ValueError):
+    pass
+
+
+def _write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ShareTokenError("Share token is truncated")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _same(value, default):
+    return type(value) is type(default) and value == default
+
+
+def encode(inputs, version=CURRENT_VERSION):
+    """Token for the schema fields of ``inputs``; missing fields take the schema default."""
+    schema = SCHEMAS[version]
+    values = []
+    mask = 0
+    for bit, (name, kind, default) in enumerate(schema):
+        value = inputs.get(name, default)
+        if kind == 'bool':
+            value = bool(value)
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ShareTokenError(f"{name} must be a number, not {value!r}")
+        if not _same(value, default):
+            mask |= 1 << bit
+            values.append((kind, value))
+    out = bytearray([version])
+    _write_varint(out, mask)
+    for kind, value in values:
+        if kind == 'bool':
+            out.append(int(value))
+        elif isinstance(value, float):
+            _write_varint(out, 1)
+            out += struct.pack('<d', value)
+        else:
+            if not -(1 << 63) <= value < 1 << 63:
+                raise ShareTokenError(f"{value} is too large to share")
+            _write_varint(out, ((value << 1) ^ (value >> 63)) << 1)
+    return base64.urlsafe_b64encode(bytes(out)).rstrip(b'=').decode('ascii')
+
+
+def decode(token):
+    """Inputs dict (every field of the current schema) from a token of any known version."""
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (ValueError, TypeError) as exc:
+        raise ShareTokenError("Share token is not valid base64") from exc
+    if not data or data[0] not in SCHEMAS:
+        raise ShareTokenError("Share token has an unknown version")
+    schema = SCHEMAS[data[0]]
+    mask, pos = _read_varint(data, 1)
+    if mask >> len(schema):
+        raise ShareTokenError("Share token sets fields its version does not have")
+    inputs = {name: default for name, kind, default in SCHEMAS[CURRENT_VERSION]}
+    for bit, (name, kind, default) in enumerate(schema):
+        if not mask >> bit & 1:
+            inputs[name] = default
+            continue
+        if kind == 'bool':
+            if pos >= len(data):
+                raise ShareTokenError("Share token is truncated")
+            inputs[name] = bool(data[pos])
+            pos += 1
+            continue
+        head, pos = _read_varint(data, pos)
+        if head & 1:
+            if pos + 8 > len(data):
+                raise ShareTokenError("Share token is truncated")
+            inputs[name] = struct.unpack_from('<d', data, pos)[0]
+            pos += 8
+        else:
+            zigzag = head >> 1
+            inputs[name] = (zigzag >> 1) ^ -(zigzag & 1)
+    if pos != len(data):
+        raise ShareTokenError("Share token has trailing data")
+    return inputs
+
+
+def from_legacy_params(params):
+    """Inputs from an old-style link that put every value in its own query parameter.
+
+    Values are parsed with the schema's kind, so only the schema fields are read.
+    """
+    inputs = {}
+    for name, kind, default in SCHEMAS[CURRENT_VERSION]:
+        if name not in params:
+            continue
+        value = params[name]
+        try:
+            if kind == 'bool':
+                inputs[name] = value.lower() == 'true'
+            elif any(c in value for c in '.eE') or value.lower() in ('inf', 'nan'):
+                inputs[name] = float(value)
+            else:
+                inputs[name] = int(value)
+        except ValueError as exc:
+            raise ShareTokenError(f"{name}={value!r} is not a valid number") from exc
+    return inputs
+
+
+class ShortLinkStore:
+    """Short ids for share tokens in a SQLite file; shortening the same token gives the same id."""
+
+    def __init__(self, path, id_length=8):
+        self.path = path
+        self.id_length = id_length
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS links (id TEXT PRIMARY KEY, token TEXT NOT NULL UNIQUE, "
+                       "created REAL NOT NULL) WITHOUT ROWID")
+
+    def _connect(self):
+        # One short-lived autocommit connection per call keeps the store safe to share between sessions
+        return contextlib.closing(sqlite3.connect(self.path, timeout=10, isolation_level=None))
+
+    def shorten(self, token):
+        digest = base64.urlsafe_b64encode(hashlib.sha256(token.encode()).digest()).decode('ascii')
+        with self._connect() as db:
+            existing = db.execute("SELECT id FROM links WHERE token = ?", (token,)).fetchone()
+            if existing:
+                return existing[0]
+            # Lengthen the id on the (unlikely) collision with a different token
+            for length in range(self.id_length, len(digest) + 1):
+                link_id = digest[:length]
+                db.execute("INSERT OR IGNORE INTO links VALUES (?, ?, ?)", (link_id, token, time.time()))
+                row = db.execute("SELECT token FROM links WHERE id = ?", (link_id,)).fetchone()
+                if row and row[0] == token:
+                    return link_id
+        raise ShareTokenError("Could not allocate a short link")
+
+    def resolve(self, link_id):
+        with self._connect() as db:
+            row = db.execute("SELECT token FROM links WHERE id = ?", (link_id,)).fetchone()
+        if row is None:
+            raise ShareTokenError(f"Unknown short link {link_id!r}")
+        return row[0]
+
+
+@functools.lru_cache(maxsize=None)
+def short_link_store(path=SHORT_LINKS_PATH):
+    """The store at ``path`` (``MUX_PRICING_SHORT_LINKS`` by default), or None when short links are off."""
+    return ShortLinkStore(path) if path else None
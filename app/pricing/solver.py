@@ -0,0 +1,99 @@
+"""Budget inversion: the largest usage whose spend fits a monthly budget.
+
+Spend is piecewise linear in usage, so instead of searching, every linear segment
+is solved in closed form and the largest feasible answer is kept. Segments are
+evaluated for all budgets at once, which makes thousands of inversions a few
+array operations. ``previous_tier_max_spend`` is taken as published, so a tier
+whose spend restarts below the previous tier's maximum is handled as well.
+"""
+
+
+def _tier_ends(rate_card, rows):
+    import numpy as np
+
+    start = rate_card.start[rows]
+    next_start = np.concatenate([start[:, 1:], np.full((len(rows), 1), np.inf)], axis=1)
+    return np.minimum(next_start, rate_card.end[rows][:, None])
+
+
+def max_sku_usage(skus, budgets, rate_card=None):
+    """Largest monthly usage of each SKU whose own spend stays within ``budgets``.
+
+    ``budgets`` broadcasts against ``skus`` (e.g. shape ``(N, len(skus))`` or ``(N, 1)``).
+    SKUs that are free within their last tier return their open-ended tier limit;
+    negative budgets return NaN.
+    """
+    import numpy as np
+
+    from pricing.rates import load_rate_card
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    rows = rate_card.rows(skus)
+    budgets = np.asarray(budgets, dtype=np.float64)[..., None]
+    start = rate_card.start[rows]
+    price = rate_card.price[rows]
+    previous_tier_max_spend = rate_card.previous_tier_max_spend[rows]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        usage = np.where(price > 0, start + (budgets - previous_tier_max_spend) / price, np.inf)
+    usage = np.minimum(usage, _tier_ends(rate_card, rows))
+    feasible = np.isfinite(start) & (budgets >= previous_tier_max_spend)
+    best = np.where(feasible, usage, -np.inf).max(axis=-1)
+    return np.where(np.isneginf(best), np.nan, best)
+
+
+def max_volume(variable, budgets, inputs=None, rate_card=None, include_plan=True):
+    """Largest value of a volume input whose total monthly spend fits each budget.
+
+    The other inputs (resolution mix, storage lifecycle, baseline toggle and the other
+    volumes) are held at ``inputs``. With ``include_plan`` the budget is the Starter
+    Plan bill from ``calculate_totals`` (usage spend less the plan credit, never
+    below the plan cost); budgets under the plan cost, or already exceeded by the
+    fixed SKUs, return NaN.
+    """
+    import numpy as np
+
+    from pricing.rates import load_rate_card
+    from pricing.sweep import _swept_skus
+    from pricing.totals import STARTER_PLAN_COST, STARTER_PLAN_CREDIT
+    from pricing.usage import load_sku_drivers, usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    inputs = dict(inputs or {})
+    budgets = np.asarray(budgets, dtype=np.float64)
+    spend_budgets = budgets
+    if include_plan:
+        spend_budgets = np.where(budgets >= STARTER_PLAN_COST, budgets + STARTER_PLAN_CREDIT, np.nan)
+
+    swept = _swept_skus(variable, load_sku_drivers())
+    skus, fixed_usage = usage_matrix(inputs)
+    rows = rate_card.rows(skus)
+    fixed_spend = rate_card.spend(rows[~swept], fixed_usage[0, ~swept]).sum()
+    _, unit_usage = usage_matrix({**inputs, variable: 1})
+    coefficients = unit_usage[0, swept]
+    rows = rows[swept][coefficients > 0]
+    coefficients = coefficients[coefficients > 0]
+    if not len(rows):
+        return np.where(fixed_spend <= spend_budgets, np.inf, np.nan)
+
+    # Segment edges are the volumes at which any fed SKU changes tier
+    limit = (rate_card.end[rows] / coefficients).min()
+    edges = rate_card.start[rows] / coefficients[:, None]
+    left = np.unique(np.concatenate([[0.0], edges[np.isfinite(edges)]]))
+    left = left[left < limit]
+    right = np.append(left[1:], limit)
+    # Evaluate each segment at its midpoint so rounding at the edges cannot pick the wrong tier
+    middle = (left + right) / 2
+    middle_usage = middle[:, None] * coefficients
+    tiers = rate_card.tier_index(rows, middle_usage)
+    slope = (rate_card.price[rows, tiers] * coefficients).sum(axis=1)
+    left_spend = fixed_spend + rate_card.spend(rows, middle_usage).sum(axis=1) - slope * (middle - left)
+
+    spend_budgets = spend_budgets[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume = np.where(slope > 0, left + (spend_budgets - left_spend) / slope, np.inf)
+    volume = np.minimum(volume, right)
+    tolerance = 1e-9 * np.maximum(1, np.abs(spend_budgets))
+    best = np.where(left_spend <= spend_budgets + tolerance, volume, -np.inf).max(axis=-1)
+    return np.where(np.isneginf(best), np.nan, best)
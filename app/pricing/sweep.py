@@ -0,0 +1,76 @@
+"""Spend curves: monthly spend as one volume input sweeps over a grid of values."""
+SWEEP_VARIABLES = ('encoding_volume', 'live_encoding_volume', 'streaming_volume', 'storage_volume')
+
+
+def _swept_skus(variable, drivers):
+    import numpy as np
+
+    if variable not in SWEEP_VARIABLES:
+        raise ValueError(f"Cannot sweep {variable!r}; choose one of {', '.join(SWEEP_VARIABLES)}")
+    return np.array(drivers.volume_inputs)[drivers.source] == variable
+
+
+def spend_curve(variable, values, inputs=None, rate_card=None):
+    """Price every value of ``variable`` in ``values`` with the other inputs held fixed.
+
+    Only the SKUs fed by ``variable`` are repriced per point; the rest are priced once.
+    Returns a DataFrame with the swept values, the ``calculate_totals`` columns and
+    ``effective_rate`` (spend of the swept SKUs per unit of ``variable``).
+    """
+    import numpy as np
+    import pandas as pd
+
+    from pricing.rates import load_rate_card
+    from pricing.totals import calculate_batch_totals
+    from pricing.usage import load_sku_drivers, usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    inputs = dict(inputs or {})
+    drivers = load_sku_drivers()
+    swept = _swept_skus(variable, drivers)
+    values = np.asarray(values, dtype=np.float64)
+
+    skus, fixed_usage = usage_matrix(inputs)
+    rows = rate_card.rows(skus)
+    fixed_spend = rate_card.spend(rows[~swept], fixed_usage[:, ~swept])
+
+    # Usage of a swept SKU is linear in the swept volume, so one unit of volume gives its coefficient
+    _, unit_usage = usage_matrix({**inputs, variable: 1})
+    swept_spend = rate_card.spend(rows[swept], values[:, None] * unit_usage[:, swept])
+
+    # Totals only depend on category subtotals, so the fixed SKUs collapse to one column per category
+    categories = rate_card.categories[rows]
+    fixed_categories = np.unique(categories[~swept])
+    fixed_subtotals = [fixed_spend[0, categories[~swept] == category].sum() for category in fixed_categories]
+    spend = np.hstack([np.broadcast_to(fixed_subtotals, (len(values), len(fixed_categories))), swept_spend])
+    totals = calculate_batch_totals(spend, np.concatenate([fixed_categories, categories[swept]]))
+    curve = pd.DataFrame({variable: values, **totals})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curve['effective_rate'] = swept_spend.sum(axis=1) / values
+    return curve
+
+
+def tier_breakpoints(variable, inputs=None, rate_card=None, max_value=None):
+    """Values of ``variable`` at which one of the SKUs it feeds enters a new pricing tier."""
+    import numpy as np
+    import pandas as pd
+
+    from pricing.rates import load_rate_card
+    from pricing.usage import load_sku_drivers, usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    drivers = load_sku_drivers()
+    swept = _swept_skus(variable, drivers)
+    skus, unit_usage = usage_matrix({**dict(inputs or {}), variable: 1})
+    breakpoints = []
+    for sku, coefficient in zip(np.array(skus)[swept], unit_usage[0, swept]):
+        if coefficient <= 0:
+            continue
+        row = rate_card.key_index[sku]
+        for tier, start in enumerate(rate_card.start[row, 1:], start=2):
+            volume = start / coefficient
+            if np.isfinite(volume) and (max_value is None or volume <= max_value):
+                breakpoints.append({'sku': sku, 'tier': tier, variable: volume})
+    return pd.DataFrame(breakpoints, columns=['sku', 'tier', variable])
@@ -0,0 +1,187 @@
+"""Per-rerun timing spans for the calculator pages.
+
+Enabled with ``MUX_PRICING_TIMING=1``; otherwise ``span`` hands back one shared
+no-op context manager and ``timed``/``callback`` return the function unchanged, so
+disabled instrumentation costs a flag check. Set ``MUX_PRICING_TIMING_DIR`` to
+also write ``timing.json`` and a Prometheus text-format ``timing.prom`` there
+(at most once a second) for local scraping.
+
+A rerun starts at ``begin_rerun`` and ends at ``end_rerun``; spans in between are
+summed per stage. A fragment reruns without the rest of the script, so fragment
+bodies run inside ``rerun``, which records them with scope 'fragment' when no
+full rerun is in progress. Widget callbacks run just before the rerun they
+trigger, so ``callback`` parks their name and duration until the rerun begins.
+State is thread-local because Streamlit runs each session's script on its own thread.
+"""
+import collections
+import contextlib
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, math.inf)
+EXPORT_INTERVAL = 1.0
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Recorder:
+    def __init__(self, enabled=False, history=50, buckets=BUCKETS, export_dir=None):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.export_dir = export_dir
+        self.reruns = collections.deque(maxlen=history)
+        self.histograms = {}
+        self.triggers = collections.Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._exported = 0.0
+
+    def span(self, stage):
+        """Context manager adding its duration to ``stage`` of the current rerun."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(stage)
+
+    @contextlib.contextmanager
+    def _span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(stage, time.perf_counter() - started)
+
+    def _add(self, stage, seconds):
+        current = getattr(self._local, 'current', None)
+        if current is not None:
+            current['stages'][stage] = current['stages'].get(stage, 0.0) + seconds
+
+    def timed(self, stage):
+        """Decorator timing every call as ``stage``."""
+        def decorate(func):
+            if not self.enabled:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self._span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def callback(self, func):
+        """Decorator for widget callbacks: records the callback as the next rerun's trigger."""
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.pending = (func.__name__, time.perf_counter() - started)
+        return wrapper
+
+    def begin_rerun(self, page=None, scope='app'):
+        if not self.enabled:
+            return
+        trigger, seconds = getattr(self._local, 'pending', None) or (None, None)
+        self._local.pending = None
+        self._local.current = {'started': time.time(), 'page': page, 'scope': scope, 'trigger': trigger,
+                               'stages': {}, '_clock': time.perf_counter()}
+        if seconds is not None:
+            self._local.current['stages']['callback'] = seconds
+
+    def set_page(self, page):
+        current = getattr(self._local, 'current', None) if self.enabled else None
+        if current is not None:
+            current['page'] = page
+
+    @contextlib.contextmanager
+    def rerun(self, page):
+        """Attribute the enclosed code to ``page``; a fragment rerun on its own is recorded with scope 'fragment'."""
+        if not self.enabled or getattr(self._local, 'current', None) is not None:
+            self.set_page(page)
+            yield
+            return
+        self.begin_rerun(page, scope='fragment')
+        try:
+            yield
+        finally:
+            self.end_rerun()
+
+    def end_rerun(self):
+        current = getattr(self._local, 'current', None) if self.enabled else None
+        if current is None:
+            return
+        self._local.current = None
+        current['stages']['rerun'] = time.perf_counter() - current.pop('_clock')
+        with self._lock:
+            self.reruns.append(current)
+            self.triggers[(current['page'], current['scope'], current['trigger'])] += 1
+            for stage, seconds in current['stages'].items():
+                histogram = self.histograms.setdefault((stage, current['page'], current['scope']),
+                                                       {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        histogram['buckets'][i] += 1
+                histogram['sum'] += seconds
+                histogram['count'] += 1
+        if self.export_dir and time.monotonic() - self._exported >= EXPORT_INTERVAL:
+            self._exported = time.monotonic()
+            self.write(self.export_dir)
+
+    def recent(self):
+        with self._lock:
+            return list(self.reruns)
+
+    def to_json(self):
+        with self._lock:
+            return {
+                'buckets': [bound if math.isfinite(bound) else '+Inf' for bound in self.buckets],
+                'histograms': [{'stage': stage, 'page': page, 'scope': scope, **histogram}
+                               for (stage, page, scope), histogram in self.histograms.items()],
+                'reruns': [{'page': page, 'scope': scope, 'trigger': trigger, 'count': count}
+                           for (page, scope, trigger), count in self.triggers.items()],
+                'recent': list(self.reruns),
+            }
+
+    def to_prometheus(self):
+        def labels(**values):
+            return ','.join(f'{key}="{value if value is not None else ""}"' for key, value in values.items())
+
+        lines = ['# HELP mux_pricing_stage_seconds Time spent in each stage of a calculator rerun.',
+                 '# TYPE mux_pricing_stage_seconds histogram']
+        with self._lock:
+            for (stage, page, scope), histogram in sorted(self.histograms.items(), key=lambda item: str(item[0])):
+                series = labels(stage=stage, page=page, scope=scope)
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    le = f"{bound:g}" if math.isfinite(bound) else '+Inf'
+                    lines.append(f"mux_pricing_stage_seconds_bucket{{{series},{labels(le=le)}}} {count}")
+                lines.append(f"mux_pricing_stage_seconds_sum{{{series}}} {histogram['sum']:.9f}")
+                lines.append(f"mux_pricing_stage_seconds_count{{{series}}} {histogram['count']}")
+            lines += ['# HELP mux_pricing_reruns_total Calculator reruns by page, scope and triggering callback.',
+                      '# TYPE mux_pricing_reruns_total counter']
+            for (page, scope, trigger), count in sorted(self.triggers.items(), key=str):
+                lines.append(f"mux_pricing_reruns_total{{{labels(page=page, scope=scope, trigger=trigger)}}} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory):
+        """Write ``timing.json`` and ``timing.prom``, each replaced atomically."""
+        os.makedirs(directory, exist_ok=True)
+        for name, text in (('timing.json', json.dumps(self.to_json())), ('timing.prom', self.to_prometheus())):
+            staging = os.path.join(directory, f".{name}.tmp")
+            with open(staging, 'w') as f:
+                f.write(text)
+            os.replace(staging, os.path.join(directory, name))
+
+
+recorder = Recorder(enabled=os.environ.get('MUX_PRICING_TIMING', '') not in ('', '0'),
+                    export_dir=os.environ.get('MUX_PRICING_TIMING_DIR') or None)
+span = recorder.span
+timed = recorder.timed
+callback = recorder.callback
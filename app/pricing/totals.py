@@ -0,0 +1,75 @@
+from typing import NamedTuple
+
+STARTER_PLAN_COST = 10
+STARTER_PLAN_CREDIT = 100
+
+
+class Totals(NamedTuple):
+    spend_df: object
+    storage_spend: float
+    encoding_spend: float
+    streaming_spend: float
+    total_spend: float
+    mux_credits: float
+    total_spend_developer_plan: float
+    developer_plan_cost: float
+
+
+def calculate_totals(spend_df):
+    storage_spend = spend_df[(spend_df['sku_category'] == 'Storage')]['total_spend'].sum()
+    encoding_spend = spend_df[(spend_df['sku_category'] == 'Encoding')]['total_spend'].sum()
+    streaming_spend = spend_df[(spend_df['sku_category'] == 'Streaming')]['total_spend'].sum()
+    return totals_from_subtotals(spend_df, storage_spend, encoding_spend, streaming_spend,
+                                 spend_df['total_spend'].sum())
+
+
+def totals_from_subtotals(spend_df, storage_spend, encoding_spend, streaming_spend, usage_spend):
+    """Apply the Starter Plan to category subtotals and the total usage spend."""
+    total_spend = usage_spend - STARTER_PLAN_CREDIT
+    total_spend_developer_plan = max(total_spend, STARTER_PLAN_COST)
+    developer_plan_cost = STARTER_PLAN_COST
+    mux_credits = max(-STARTER_PLAN_CREDIT, -1 * (storage_spend + encoding_spend + streaming_spend))
+    return Totals(spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits,
+                  total_spend_developer_plan, developer_plan_cost)
+
+
+def quote(inputs, rate_card=None):
+    """Price a mapping of calculator inputs (see ``pricing.usage.DEFAULT_INPUTS``) under the Starter Plan."""
+    from pricing.engine import calculate_spend
+    from pricing.rates import load_rate_card
+    from pricing.usage import usage_frame
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    return calculate_totals(calculate_spend(usage_frame(inputs), rate_card))
+
+
+def calculate_batch_totals(spend_matrix, categories):
+    """``calculate_totals`` for an (N scenarios x SKUs) spend matrix; returns a dict of length-N arrays."""
+    import numpy as np
+
+    categories = np.asarray(categories)
+    # One matrix product gives every category subtotal for every scenario
+    category_totals = spend_matrix @ (categories[:, None] == np.array(['Storage', 'Encoding', 'Streaming']))
+    storage_spend, encoding_spend, streaming_spend = category_totals.T
+    total_spend = spend_matrix.sum(axis=1) - STARTER_PLAN_CREDIT
+    return {
+        'storage_spend': storage_spend,
+        'encoding_spend': encoding_spend,
+        'streaming_spend': streaming_spend,
+        'total_spend': total_spend,
+        'mux_credits': np.maximum(-STARTER_PLAN_CREDIT, -1 * (storage_spend + encoding_spend + streaming_spend)),
+        'total_spend_developer_plan': np.maximum(total_spend, STARTER_PLAN_COST),
+    }
+
+
+def quote_batch(inputs, n_scenarios, rate_card=None):
+    """Vectorized ``quote`` over inputs given as length-``n_scenarios`` columns (e.g. a DataFrame)."""
+    from pricing.rates import load_rate_card
+    from pricing.usage import usage_matrix
+
+    if rate_card is None:
+        rate_card = load_rate_card()
+    skus, usage = usage_matrix(inputs, n_scenarios)
+    rows = rate_card.rows(skus)
+    return calculate_batch_totals(rate_card.spend(rows, usage), rate_card.categories[rows])
@@ -0,0 +1,171 @@
+"""Derive per-SKU monthly usage from the calculator inputs.
+
+Each SKU in ``data/sku_drivers.csv`` records which volume input feeds it, which
+``resolution_mix_*`` share applies, whether it is billed on the baseline or smart
+encoding tier and which storage lifecycle share it takes. Usage is then
+
+    volume[source] * resolution_mix[resolution] / 100 * encoding_tier_share * storage_tier_share
+
+evaluated for every SKU (and every scenario of a batch) as one array product, so
+adding a SKU or resolution is a row in the table rather than code.
+"""
+import csv
+import functools
+import os
+from typing import NamedTuple
+
+DEFAULT_INPUTS = {
+    'encoding_volume': 1000,
+    'live_encoding_volume': 500,
+    'storage_volume': 6000,
+    'streaming_volume': 20000,
+    'percent_baseline': 100,
+    'cold_percent': 60,
+    'infrequent_percent': 10,
+    'hot_percent': 30,
+    'resolution_mix_720p': 100,
+    'resolution_mix_1080p': 0,
+    'resolution_mix_1440p': 0,
+    'resolution_mix_2160p': 0,
+    'bandwidth_gb': 100,
+    'bandwidth_bitrate': 3.5,
+    'library_size_gb': 100,
+    'baseline_toggle': False,
+}
+
+SKU_DRIVERS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data',
+                                'sku_drivers.csv')
+
+ENCODING_TIERS = ('', 'baseline', 'smart')
+STORAGE_TIERS = ('', 'hot', 'infrequent', 'cold')
+STORAGE_INPUTS = {'hot': 'hot_percent', 'infrequent': 'infrequent_percent', 'cold': 'cold_percent'}
+# Inputs a usage record (bulk file row, API scenario) may set
+VOLUME_INPUTS = ('encoding_volume', 'live_encoding_volume', 'streaming_volume', 'storage_volume')
+PERCENT_INPUTS = ('resolution_mix_720p', 'resolution_mix_1080p', 'resolution_mix_1440p', 'resolution_mix_2160p',
+                  'cold_percent', 'infrequent_percent', 'hot_percent')
+PRICING_COLUMNS = VOLUME_INPUTS + PERCENT_INPUTS + ('baseline_toggle',)
+
+
+class SkuDrivers(NamedTuple):
+    """Driver table compiled into row indices of the factor matrix built by ``usage_matrix``.
+
+    Factor rows are the volume inputs, then the resolution mixes, then a row of ones,
+    the baseline and smart encoding-tier shares and the hot/infrequent/cold shares.
+    """
+    skus: tuple
+    volume_inputs: tuple
+    resolutions: tuple
+    source: object
+    resolution: object
+    encoding_tier: object
+    storage_tier: object
+
+
+@functools.lru_cache(maxsize=None)
+def load_sku_drivers(file_path=SKU_DRIVERS_PATH):
+    import numpy as np
+
+    with open(file_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    volume_inputs = tuple(dict.fromkeys(row['source_volume'] for row in rows))
+    resolutions = tuple(dict.fromkeys(row['resolution'] for row in rows))
+    for row in rows:
+        if row['encoding_tier'] not in ENCODING_TIERS or row['storage_tier'] not in STORAGE_TIERS:
+            raise ValueError(f"{file_path}: unknown encoding or storage tier for SKU {row['sku']!r}")
+    ones = len(volume_inputs) + len(resolutions)
+    # The '' tier of both lookups maps onto the row of ones
+    encoding_rows = {tier: ones + i for i, tier in enumerate(ENCODING_TIERS)}
+    storage_rows = {'': ones, **{tier: ones + len(ENCODING_TIERS) + i for i, tier in enumerate(STORAGE_TIERS[1:])}}
+    return SkuDrivers(
+        skus=tuple(row['sku'] for row in rows),
+        volume_inputs=volume_inputs,
+        resolutions=resolutions,
+        source=np.array([volume_inputs.index(row['source_volume']) for row in rows], dtype=np.intp),
+        resolution=np.array([len(volume_inputs) + resolutions.index(row['resolution']) for row in rows],
+                            dtype=np.intp),
+        encoding_tier=np.array([encoding_rows[row['encoding_tier']] for row in rows], dtype=np.intp),
+        storage_tier=np.array([storage_rows[row['storage_tier']] for row in rows], dtype=np.intp),
+    )
+
+
+def _input(inputs, key):
+    return inputs.get(key, DEFAULT_INPUTS.get(key, 0))
+
+
+def factor_inputs(drivers=None):
+    """The input each row of the ``usage_factors`` matrix is read from (None for the row of ones)."""
+    if drivers is None:
+        drivers = load_sku_drivers()
+    return (drivers.volume_inputs + tuple(f"resolution_mix_{resolution}" for resolution in drivers.resolutions)
+            + (None, 'baseline_toggle', 'baseline_toggle') + tuple(STORAGE_INPUTS[tier] for tier in STORAGE_TIERS[1:]))
+
+
+def usage_factors(inputs, n_scenarios=1, drivers=None):
+    """The (factors x n_scenarios) matrix whose rows the driver table indexes."""
+    import numpy as np
+
+    if drivers is None:
+        drivers = load_sku_drivers()
+    keys = drivers.volume_inputs + tuple(f"resolution_mix_{resolution}" for resolution in drivers.resolutions)
+    ones = len(keys)
+    factors = np.empty((ones + len(ENCODING_TIERS) + len(STORAGE_TIERS) - 1, n_scenarios))
+    for row, key in enumerate(keys):
+        factors[row] = _input(inputs, key)
+    baseline = np.asarray(_input(inputs, 'baseline_toggle')) == True
+    factors[ones] = 1
+    factors[ones + 1] = baseline
+    factors[ones + 2] = ~baseline
+    for row, tier in enumerate(STORAGE_TIERS[1:], start=ones + len(ENCODING_TIERS)):
+        factors[row] = _input(inputs, STORAGE_INPUTS[tier])
+        factors[row] /= 100
+    return factors
+
+
+def usage_matrix(inputs, n_scenarios=1, drivers=None):
+    """Usage for every SKU as an (n_scenarios x SKUs) array; returns ``(skus, matrix)``.
+
+    ``inputs`` maps input names to scalars or to length-``n_scenarios`` arrays/Series;
+    missing keys fall back to ``DEFAULT_INPUTS``.
+    """
+    if drivers is None:
+        drivers = load_sku_drivers()
+    factors = usage_factors(inputs, n_scenarios, drivers)
+    usage = (factors[drivers.source] * factors[drivers.resolution] / 100
+             * factors[drivers.encoding_tier] * factors[drivers.storage_tier])
+    return list(drivers.skus), usage.T
+
+
+def canonical_inputs(inputs, drivers=None):
+    """Hashable key of exactly the inputs ``usage_matrix`` reads, with defaults filled in.
+
+    Numbers are normalised to float so ``1000`` and ``1000.0`` give the same key.
+    """
+    if drivers is None:
+        drivers = load_sku_drivers()
+    keys = (drivers.volume_inputs + tuple(f"resolution_mix_{resolution}" for resolution in drivers.resolutions)
+            + tuple(STORAGE_INPUTS.values()))
+    return tuple(float(_input(inputs, key)) for key in keys) + (bool(_input(inputs, 'baseline_toggle')),)
+
+
+def sku_usage(inputs):
+    """Monthly usage per SKU for a single scenario."""
+    skus, usage = usage_matrix(inputs)
+    return dict(zip(skus, usage[0].tolist()))
+
+
+def usage_frame(inputs):
+    import pandas as pd
+
+    skus, usage = usage_matrix(inputs)
+    return pd.DataFrame({'SKU Name': skus, 'Usage Value': usage[0]})
+
+
+def calculate_gb_volumes(bandwidth_gb, bandwidth_bitrate, library_size_gb):
+    """Convert delivered and stored gigabytes into minutes at one average bitrate (Mbps)."""
+    return {
+        'storage_volume': round(library_size_gb * 8 * 1024 / bandwidth_bitrate / 60),
+        'streaming_volume': round(bandwidth_gb * 8 * 1024 / bandwidth_bitrate / 60),
+        # Zero out encoding volumes
+        'encoding_volume': 0,
+        'live_encoding_volume': 0,
+    }
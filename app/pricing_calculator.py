@@ -1,10 +1,19 @@
+import functools
+import json
+import sqlite3
+
 import streamlit as st
 import streamlit_extras
+import numpy as np
 import pandas as pd
-import os
 
 from streamlit_extras.stylable_container import stylable_container
 
+from pricing import (cache, compare, incremental, montecarlo, optimizer, projection, rates, sharing, solver, sweep,
+                     timing, usage)
+
+timing.recorder.begin_rerun()
+
 custom_css = """
 <style>
 @import url('https://fonts.googleapis.com/css2?family=DM+Sans:wght@400;700&display=swap');
@@ -24,30 +33,35 @@ st.markdown(custom_css, unsafe_allow_html=True)
 
 
 def save_to_url():
-    params = st.query_params
-    for key, value in st.session_state.items():
-        params[key] = value
-    st.query_params.update(params)
+    try:
+        token = sharing.encode(st.session_state)
+        short_links = sharing.short_link_store()
+        if short_links is not None:
+            st.query_params['l'] = short_links.shorten(token)
+        else:
+            st.query_params['s'] = token
+    except (sharing.ShareTokenError, sqlite3.Error) as exc:
+        st.warning(f"Could not share this scenario: {exc}")
 
 
 # Function to load state from URL parameters
 def load_from_url():
     params = st.query_params
-    for key, value in params.items():
-        # Handle boolean values
-        if value.lower() == 'true' or value.lower() == 'false':
-            st.session_state[key] = value.lower() == 'true'
-        # Handle numeric values
-        elif '.' in value:
-            try:
-                st.session_state[key] = float(value)
-            except ValueError:
-                st.session_state[key] = value
+    try:
+        if 's' in params:
+            inputs = sharing.decode(params['s'])
+        elif 'l' in params:
+            short_links = sharing.short_link_store()
+            if short_links is None:
+                raise sharing.ShareTokenError("short links are not enabled on this server")
+            inputs = sharing.decode(short_links.resolve(params['l']))
         else:
-            try:
-                st.session_state[key] = int(value)
-            except ValueError:
-                st.session_state[key] = value
+            # Links shared before tokens put each value in its own parameter
+            inputs = sharing.from_legacy_params(params)
+    except (sharing.ShareTokenError, sqlite3.Error) as exc:
+        st.warning(f"Could not load the shared scenario: {exc}")
+        return
+    st.session_state.update(inputs)
 
 
 # Load state from URL on app start
@@ -55,196 +69,27 @@ if st.query_params:
     load_from_url()
 
 
-@st.cache_data
-def load_pricing_csv():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    # Construct the file path
-    file_path = os.path.join(current_dir, 'data', 'rates.csv')
-    # Load the CSV file into a DataFrame
-    df = pd.read_csv(file_path)
-    return df
-
-
-
-pricing_tiers = load_pricing_csv()
+with timing.span('load_rate_card'):
+    rate_card = rates.load_rate_card()
 
 st.title('Mux Pricing Calculator')
 
-default_values = {
-    'encoding_volume': 1000,
-    'live_encoding_volume': 500,
-    'storage_volume': 6000,
-    'streaming_volume': 20000,
-    'percent_baseline': 100,
-    'cold_percent': 60,
-    'infrequent_percent': 10,
-    'hot_percent': 30,
-    'resolution_mix_720p': 100,
-    'resolution_mix_1080p': 0,
-    'resolution_mix_1440p': 0,
-    'resolution_mix_2160p': 0,
-    'bandwidth_gb': 100,
-    'bandwidth_bitrate': 3.5,
-    'library_size_gb': 100,
-    'baseline_toggle': False,
-    'data': pd.DataFrame({
-        'SKU Name': ['baseline_encoding_720p', 'live_encoding_720p', 'baseline_storage_720p', 'streaming_720p'],
-        'Usage Value': [1000, 500, 6000, 20000]
-    })
-}
-
-for key, value in default_values.items():
+for key, value in usage.DEFAULT_INPUTS.items():
     if key not in st.session_state:
         st.session_state[key] = value
 
 
-def calculate_spend(df):
-    results = []
-    for _, row in df.iterrows():
-        filtered_pricing_df = pricing_tiers[
-            (pricing_tiers['unique_key'] == row['SKU Name']) &
-            (pricing_tiers['start'] <= row['Usage Value']) &
-            (pricing_tiers['end'] > row['Usage Value'])
-            ]
-        pricing_row = filtered_pricing_df.iloc[0]
-        # Set variable values
-        unit_price = pricing_row['price']
-        monthly_usage = row['Usage Value']
-        previous_tier_spend = pricing_row['previous_tier_max_spend']
-        marginal_spend = (monthly_usage - pricing_row['start']) * unit_price
-        total_spend = previous_tier_spend + marginal_spend
-
-        effective_rate = total_spend / monthly_usage
-        results.append({
-            'sku_category': pricing_row['sku_category'],
-            'sku': row['SKU Name'],
-            'usage': monthly_usage,
-            'effective_rate': effective_rate,
-            'total_spend': total_spend,
-        })
-    return pd.DataFrame(results)
+def pricing_state():
+    state = st.session_state.get('pricing_state')
+    if not isinstance(state, incremental.IncrementalQuote) or state.rate_card is not rate_card:
+        state = st.session_state.pricing_state = incremental.IncrementalQuote(st.session_state, rate_card)
+    return state
 
 
-def calculate_usage(resolution, source_sku, default_volume, default_resolution_mix, baseline_encoding, storage_type):
-    if baseline_encoding == True:
-        if st.session_state.get("baseline_toggle", default_values['baseline_toggle']) == True:
-            baseline_multiplier = 1
-        else:
-            baseline_multiplier = 0
-    elif baseline_encoding == False:
-        if st.session_state.get("baseline_toggle", default_values['baseline_toggle']) == True:
-            baseline_multiplier = 0
-        else:
-            baseline_multiplier = 1
-    else:
-        baseline_multiplier = 1
-    if storage_type == 'cold':
-        storage_multiplier = st.session_state.get("cold_percent", default_values['cold_percent']) / 100
-    elif storage_type == 'infrequent':
-        storage_multiplier = st.session_state.get("infrequent_percent", default_values['infrequent_percent']) / 100
-    elif storage_type == 'hot':
-        storage_multiplier = st.session_state.get("hot_percent", default_values['hot_percent']) / 100
-    else:
-        storage_multiplier = 1
-    value = st.session_state.get(f"{source_sku}", default_volume) * st.session_state.get(
-        "resolution_mix_" + f"{resolution}", default_resolution_mix) / 100 * baseline_multiplier * storage_multiplier
-    return value
-
-
-# Encoding SKUs
-def update_dataframe():
-    sku_usage_dict = {
-        # VOD Encoding SKUs
-        'baseline_encoding_720p': calculate_usage('720p', 'encoding_volume', default_values['encoding_volume'],
-                                                  default_values['resolution_mix_720p'], True, None),
-        'baseline_encoding_1080p': calculate_usage('1080p', 'encoding_volume', default_values['encoding_volume'],
-                                                   default_values['resolution_mix_1080p'], True, None),
-        'smart_encoding_720p': calculate_usage('720p', 'encoding_volume', default_values['encoding_volume'],
-                                               default_values['resolution_mix_720p'],
-                                               False, None),
-        'smart_encoding_1080p': calculate_usage('1080p', 'encoding_volume', default_values['encoding_volume'],
-                                                default_values['resolution_mix_1080p'], False, None),
-        'smart_encoding_1440p': calculate_usage('1440p', 'encoding_volume', default_values['encoding_volume'],
-                                                default_values['resolution_mix_1440p'], False, None),
-        'smart_encoding_2160p': calculate_usage('2160p', 'encoding_volume', default_values['encoding_volume'],
-                                                default_values['resolution_mix_2160p'], False, None),
-        # Live Encoding SKUs
-        'live_encoding_720p': calculate_usage('720p', 'live_encoding_volume', default_values['live_encoding_volume'],
-                                              default_values['resolution_mix_720p'], None, None),
-        'live_encoding_1080p': calculate_usage('1080p', 'live_encoding_volume', default_values['live_encoding_volume'],
-                                               default_values['resolution_mix_1080p'], None, None),
-        'live_encoding_1440p': calculate_usage('1440p', 'live_encoding_volume', default_values['live_encoding_volume'],
-                                               default_values['resolution_mix_1440p'], None, None),
-        'live_encoding_2160p': calculate_usage('2160p', 'live_encoding_volume', default_values['live_encoding_volume'],
-                                               default_values['resolution_mix_2160p'], None, None),
-        # Hot Smart Storage SKUs
-        'smart_storage_720p': calculate_usage('720p', 'storage_volume', default_values['storage_volume'],
-                                              default_values['resolution_mix_720p'],
-                                              False, 'hot'),
-        'smart_storage_1080p': calculate_usage('1080p', 'storage_volume', default_values['storage_volume'],
-                                               default_values['resolution_mix_1080p'],
-                                               False, 'hot'),
-        'smart_storage_1440p': calculate_usage('1440p', 'storage_volume', default_values['storage_volume'],
-                                               default_values['resolution_mix_1440p'],
-                                               False, 'hot'),
-        'smart_storage_2160p': calculate_usage('2160p', 'storage_volume', default_values['storage_volume'],
-                                               default_values['resolution_mix_2160p'],
-                                               False, 'hot'),
-        # Cold Smart Storage SKUs
-        'smart_cold_storage_720p': calculate_usage('720p', 'storage_volume', default_values['storage_volume'],
-                                                   default_values['resolution_mix_720p'], False, 'cold'),
-        'smart_cold_storage_1080p': calculate_usage('1080p', 'storage_volume', default_values['storage_volume'],
-                                                    default_values['resolution_mix_1080p'],
-                                                    False, 'cold'),
-        'smart_cold_storage_1440p': calculate_usage('1440p', 'storage_volume', default_values['storage_volume'],
-                                                    default_values['resolution_mix_1440p'],
-                                                    False, 'cold'),
-        'smart_cold_storage_2160p': calculate_usage('2160p', 'storage_volume', default_values['storage_volume'],
-                                                    default_values['resolution_mix_2160p'],
-                                                    False, 'cold'),
-        # Infrequent Smart Storage SKUs
-        'smart_infrequent_storage_720p': calculate_usage('720p', 'storage_volume', default_values['storage_volume'],
-                                                         default_values['resolution_mix_720p'], False, 'infrequent'),
-        'smart_infrequent_storage_1080p': calculate_usage('1080p', 'storage_volume', default_values['storage_volume'],
-                                                          default_values['resolution_mix_1080p'], False, 'infrequent'),
-        'smart_infrequent_storage_1440p': calculate_usage('1440p', 'storage_volume', default_values['storage_volume'],
-                                                          default_values['resolution_mix_1440p'], False, 'infrequent'),
-        'smart_infrequent_storage_2160p': calculate_usage('2160p', 'storage_volume', default_values['storage_volume'],
-                                                          default_values['resolution_mix_2160p'], False, 'infrequent'),
-        # Baseline Smart Storage SKUs
-        'baseline_storage_720p': calculate_usage('720p', 'storage_volume', default_values['storage_volume'],
-                                                 default_values['resolution_mix_720p'],
-                                                 True, 'hot'),
-        'baseline_storage_1080p': calculate_usage('1080p', 'storage_volume', default_values['storage_volume'],
-                                                  default_values['resolution_mix_1080p'], True, 'hot'),
-        'baseline_infrequent_storage_720p': calculate_usage('720p', 'storage_volume', default_values['storage_volume'],
-                                                            default_values['resolution_mix_720p'],
-                                                            True, 'infrequent'),
-        'baseline_infrequent_storage_1080p': calculate_usage('1080p', 'storage_volume',
-                                                             default_values['storage_volume'],
-                                                             default_values['resolution_mix_1080p'], True,
-                                                             'infrequent'),
-        'baseline_cold_storage_720p': calculate_usage('720p', 'storage_volume', default_values['storage_volume'],
-                                                      default_values['resolution_mix_720p'],
-                                                      True, 'cold'),
-        'baseline_cold_storage_1080p': calculate_usage('1080p', 'storage_volume', default_values['storage_volume'],
-                                                       default_values['resolution_mix_1080p'], True, 'cold'),
-        # Streaming SKUs
-        'streaming_720p': calculate_usage('720p', 'streaming_volume', default_values['streaming_volume'],
-                                          default_values['resolution_mix_720p'],
-                                          None, None),
-        'streaming_1080p': calculate_usage('1080p', 'streaming_volume', default_values['streaming_volume'],
-                                           default_values['resolution_mix_1080p'],
-                                           None, None),
-        'streaming_1440p': calculate_usage('1440p', 'streaming_volume', default_values['streaming_volume'],
-                                           default_values['resolution_mix_1440p'],
-                                           None, None),
-        'streaming_2160p': calculate_usage('2160p', 'streaming_volume', default_values['streaming_volume'],
-                                           default_values['resolution_mix_2160p'],
-                                           None, None)
-    }
-    usage_df = pd.DataFrame(list(sku_usage_dict.items()), columns=['SKU Name', 'Usage Value'])
-    st.session_state.data = usage_df
+@timing.timed('update_pricing')
+def update_pricing():
+    # Reprices only the SKUs fed by inputs that changed since the last update
+    pricing_state().update(st.session_state)
 
 
 def format_spend(input_value):
@@ -253,48 +98,54 @@ def format_spend(input_value):
 
 
 # Define functions to update target variables
+@timing.callback
 def update_usage_volumes():
     st.session_state['encoding_volume'] = st.session_state['encoding_volume_input']
     st.session_state['live_encoding_volume'] = st.session_state['live_encoding_volume_input']
     st.session_state['streaming_volume'] = st.session_state['streaming_volume_input']
     st.session_state['storage_volume'] = st.session_state['storage_volume_input']
-    update_dataframe()
+    update_pricing()
     st.query_params.clear()
 
 
+@timing.callback
 def update_baseline_toggle():
     st.session_state['baseline_toggle'] = st.session_state['baseline_toggle_input']
-    update_dataframe()
+    update_pricing()
     st.query_params.clear()
 
+@timing.callback
 def update_gb_volumes():
     st.session_state['bandwidth_gb'] = st.session_state['bandwidth_gb_input']
     st.session_state['bandwidth_bitrate'] = st.session_state['bandwidth_bitrate_input']
     st.session_state['library_size_gb'] = st.session_state['library_size_gb_input']
     calculate_gb_volumes()
-    update_dataframe()
+    update_pricing()
     st.query_params.clear()
 
 
+@timing.callback
 def update_encoding_tier():
     st.session_state['percent_baseline'] = st.session_state['percent_baseline_input']
     st.query_params.clear()
 
 
+@timing.callback
 def update_storage_lifecycle():
     st.session_state['cold_percent'] = st.session_state['cold_percent_input']
     st.session_state['infrequent_percent'] = st.session_state['infrequent_percent_input']
     st.session_state['hot_percent'] = st.session_state['hot_percent_input']
-    update_dataframe()
+    update_pricing()
     st.query_params.clear()
 
 
+@timing.callback
 def update_resolution_mix():
     st.session_state['resolution_mix_720p'] = st.session_state['resolution_mix_720p_input']
     st.session_state['resolution_mix_1080p'] = st.session_state['resolution_mix_1080p_input']
     st.session_state['resolution_mix_1440p'] = st.session_state['resolution_mix_1440p_input']
     st.session_state['resolution_mix_2160p'] = st.session_state['resolution_mix_2160p_input']
-    update_dataframe()
+    update_pricing()
     st.query_params.clear()
 
 
@@ -320,19 +171,17 @@ def update_input_variables():
                         on_change=update_usage_volumes)
 
 
-def calculate_totals(df):
-    st.session_state.spend_data = calculate_spend(df)
-    spend_df = st.session_state.spend_data
-    storage_spend = st.session_state.spend_data[(spend_df['sku_category'] == 'Storage')]['total_spend'].sum()
-    encoding_spend = spend_df[(spend_df['sku_category'] == 'Encoding')]['total_spend'].sum()
-    streaming_spend = spend_df[(spend_df['sku_category'] == 'Streaming')]['total_spend'].sum()
-    total_spend = spend_df['total_spend'].sum() - 100
-    total_spend_developer_plan = max(total_spend, 10)
-    developer_plan_cost = 10
-    mux_credits = max(-100, -1 * (storage_spend + encoding_spend + streaming_spend))
-    return spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost
+@timing.timed('calculate_totals')
+def calculate_totals():
+    # Memoized across reruns and sessions; a miss is served from this session's incremental state
+    state = pricing_state()
+    spend_totals = cache.cached_quote(st.session_state, rate_card,
+                                      compute=lambda: state.update(st.session_state).totals())
+    st.session_state.spend_data = spend_totals.spend_df
+    return spend_totals
 
 
+@timing.timed('display_totals')
 def display_totals(spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits,
                    total_spend_developer_plan, developer_plan_cost):
     with st.container(border=True):
@@ -359,27 +208,51 @@ def display_totals(spend_df, storage_spend, encoding_spend, streaming_spend, tot
     with st.container(border=True):
         st.header("Spend details (excludes Starter Plan credits)")
         filtered_spend_df = spend_df[spend_df['usage'] != 0]
-        filtered_spend_df = filtered_spend_df.style.format(
-            {
-                "usage": lambda x: '{:,.0f}'.format(x),
-                "total_spend": lambda x : '${:,.0f}'.format(x),
-                "effective_rate": lambda x: '${:,.4f}'.format(x)
-            }
-        )
+        # Sent as pre-formatted text: a Styler ships both the raw values and a display copy of every cell
+        filtered_spend_df = pd.DataFrame({
+            'sku_category': filtered_spend_df['sku_category'],
+            'sku': filtered_spend_df['sku'],
+            'usage': filtered_spend_df['usage'].map('{:,.0f}'.format),
+            'effective_rate': filtered_spend_df['effective_rate'].map('${:,.4f}'.format),
+            'total_spend': filtered_spend_df['total_spend'].map('${:,.0f}'.format),
+        })
         st.dataframe(filtered_spend_df,
                      hide_index=True,
                      column_config={
                          'sku_category': 'SKU category',
                          'sku': 'SKU name',
-                         'usage': 'Monthly usage',
-                         'effective_rate': st.column_config.NumberColumn(
-                             label='Effective rate'
+                         'usage': st.column_config.TextColumn(
+                             label='Monthly usage', alignment='right'
                          ),
-                         'total_spend': st.column_config.NumberColumn(
-                             label='Monthly spend'
+                         'effective_rate': st.column_config.TextColumn(
+                             label='Effective rate', alignment='right'
+                         ),
+                         'total_spend': st.column_config.TextColumn(
+                             label='Monthly spend', alignment='right'
                          )
                      })
 
+def page_fragment(page):
+    """Render the decorated function as a fragment: its own widgets rerun only it, timed as ``page``."""
+    def decorate(func):
+        @st.fragment
+        @functools.wraps(func)
+        def wrapper():
+            if rates.load_rate_card() is not rate_card:
+                # rates.csv was reloaded since the last full run; reprice everything with the new card
+                st.rerun()
+            with timing.recorder.rerun(page):
+                func()
+        return wrapper
+    return decorate
+
+
+def styled_container(key, css_styles):
+    # Times the CSS injection only, not the widgets placed in the container
+    with timing.span('stylable_container'):
+        return stylable_container(key=key, css_styles=css_styles)
+
+
 def button_layouts():
     with st.container(border=False):
         col1, col2, col3, col4 = st.columns(4)
@@ -391,12 +264,13 @@ def button_layouts():
 st.logo('images/Mux Logo Medium Charcoal.png', link="https://www.mux.com")
 
 
+@page_fragment('home')
 def home():
     st.query_params.clear()
-    update_dataframe()
+    update_pricing()
     button_layouts()
-    spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost = calculate_totals(st.session_state.data)
-    with stylable_container(
+    spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost = calculate_totals()
+    with styled_container(
       key="container_with_background",
       css_styles="""
             {
@@ -415,13 +289,14 @@ def home():
         save_to_url()
 
 
+@page_fragment('advanced')
 def advanced():
     st.query_params.clear()
-    update_dataframe()
+    update_pricing()
     button_layouts()
     # Bring in calculated variables
-    spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost = calculate_totals(st.session_state.data)
-    with stylable_container(
+    spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost = calculate_totals()
+    with styled_container(
             key="container_with_background",
             css_styles="""
             {
@@ -482,27 +357,331 @@ def advanced():
     # Bring in Totals from main logic above
     display_totals(spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits,
                    total_spend_developer_plan, developer_plan_cost)
+    spend_curve()
+    budget_planner()
+    cheapest_configuration()
+    forecast_uncertainty()
+    growth_projection()
+    rate_card_comparison()
     if st.button('Share URL'):
         st.query_params.clear()
         save_to_url()
 
 
+def vega_lite_spec(chart):
+    """Vega-Lite dict of an Altair chart with its data inline, to render with ``st.vega_lite_chart``."""
+    spec = chart.to_dict()
+    # Altair's default theme only fixes a 300px view, which st.altair_chart leaves out as well
+    spec.pop('config', None)
+    # Streamlit sends DataFrame datasets as Arrow directly, without rebuilding them from records on each rerun
+    spec['datasets'] = {name: pd.DataFrame(values) for name, values in spec.get('datasets', {}).items()}
+    return spec
+
+
+sweep_labels = {
+    'encoding_volume': 'On demand minutes',
+    'live_encoding_volume': 'Live minutes',
+    'streaming_volume': 'Streaming minutes',
+    'storage_volume': 'Storage minutes',
+}
+
+
+@page_fragment('advanced')
+@timing.timed('spend_curve')
+def spend_curve():
+    import altair as alt
+
+    with st.container(border=True):
+        st.header("Spend curve")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            variable = st.selectbox("Volume to sweep", list(sweep_labels), format_func=sweep_labels.get,
+                                    index=2, key='sweep_variable_input')
+        with col2:
+            max_volume = st.number_input("Up to (minutes)", min_value=1000, step=1000000, value=10000000,
+                                         key='sweep_max_volume_input')
+        with col3:
+            points = st.number_input("Points", min_value=10, max_value=100000, step=1000, value=1000,
+                                     key='sweep_points_input')
+        def charts():
+            curve = sweep.spend_curve(variable, np.linspace(0, max_volume, points), st.session_state, rate_card)
+            breakpoints = sweep.tier_breakpoints(variable, st.session_state, rate_card, max_volume)
+            # Keep the chart payload small; tier breakpoints are drawn exactly as rules
+            curve = curve[[variable, 'total_spend_developer_plan', 'effective_rate']].iloc[::max(1, len(curve) // 2000)]
+            x = alt.X(variable, title=sweep_labels[variable], axis=alt.Axis(format='~s'))
+            rules = alt.Chart(breakpoints).mark_rule(strokeDash=[4, 4], color='#888888').encode(
+                x=variable, tooltip=['sku', 'tier', alt.Tooltip(variable, format=',.0f')])
+            spend = alt.Chart(curve).mark_line().encode(
+                x=x, y=alt.Y('total_spend_developer_plan', title='Total monthly spend ($)'))
+            rate = alt.Chart(curve).mark_line().encode(
+                x=x, y=alt.Y('effective_rate', title='Effective rate ($/minute)'))
+            return vega_lite_spec(spend + rules), vega_lite_spec(rate + rules)
+
+        # The curve does not depend on the swept volume's current value, so editing it reuses the charts
+        spend_spec, rate_spec = cache.cached_section('spend_curve', (variable, max_volume, points),
+                                                     dict(st.session_state, **{variable: 0}), rate_card, charts)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.vega_lite_chart(spend_spec)
+        with col2:
+            st.vega_lite_chart(rate_spec)
+        st.caption("Dashed lines mark the volumes at which a SKU enters its next pricing tier.")
+
+
+@page_fragment('advanced')
+@timing.timed('budget_planner')
+def budget_planner():
+    with st.container(border=True):
+        st.header("Budget planner")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            budget = st.number_input("Monthly budget ($)", min_value=10, step=100, value=1000, key='budget_input')
+        def table():
+            max_minutes = []
+            for variable in sweep_labels:
+                volume = float(solver.max_volume(variable, budget, st.session_state, rate_card))
+                if np.isnan(volume):
+                    max_minutes.append("Over budget at 0 minutes")
+                elif volume >= rates.OPEN_ENDED:
+                    max_minutes.append("No limit")
+                else:
+                    max_minutes.append('{:,.0f}'.format(volume))
+            return pd.DataFrame({'volume': list(sweep_labels.values()), 'max_minutes': max_minutes})
+
+        st.dataframe(cache.cached_section('budget_planner', budget, st.session_state, rate_card, table),
+                     hide_index=True,
+                     column_config={'volume': 'Usage', 'max_minutes': 'Maximum monthly minutes'})
+        st.caption("Largest volume that fits the budget (incl. Starter Plan) with all other usage, "
+                   "resolution mix and storage mix held at their current values.")
+
+
+@page_fragment('advanced')
+@timing.timed('cheapest_configuration')
+def cheapest_configuration():
+    with st.container(border=True):
+        st.header("Cheapest configuration")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            min_1080p = st.number_input("Minimum percent 1080p", min_value=0, max_value=100, step=10, value=0,
+                                        key='optimizer_min_1080p_input')
+        with col2:
+            max_cold = st.number_input("Maximum percent cold", min_value=0, max_value=100, step=10, value=100,
+                                       key='optimizer_max_cold_input')
+        with col3:
+            allow_baseline = st.checkbox("Allow baseline encoding tier", value=True,
+                                         key='optimizer_allow_baseline_input')
+        if not st.button("Find cheapest configuration"):
+            return
+        constraints = {'resolution_mix_1080p': (min_1080p, None), 'cold_percent': (None, max_cold)}
+        if not allow_baseline:
+            constraints['baseline_toggle'] = (0, 0)
+        result = optimizer.optimize(st.session_state, constraints, rate_card=rate_card)
+        options = result.options.assign(
+            total_spend_developer_plan=result.options['total_spend_developer_plan'].map('${:,.0f}'.format),
+            savings=result.options['savings'].map(format_spend),
+        )
+        if result.current_spend != result.current_spend:
+            # No current resolution mix or lifecycle to compare against
+            options = options.drop(columns='savings')
+        st.dataframe(options,
+                     hide_index=True,
+                     column_config={
+                         'resolution_mix_720p': '720p %',
+                         'resolution_mix_1080p': '1080p %',
+                         'resolution_mix_1440p': '1440p %',
+                         'resolution_mix_2160p': '2160p %',
+                         'hot_percent': 'Hot %',
+                         'infrequent_percent': 'Infrequent %',
+                         'cold_percent': 'Cold %',
+                         'baseline_toggle': 'Baseline tier',
+                         'total_spend_developer_plan': st.column_config.TextColumn(
+                             label='Monthly spend', alignment='right'
+                         ),
+                         'savings': st.column_config.TextColumn(
+                             label='Monthly savings', alignment='right'
+                         ),
+                     })
+        st.caption(f"Searched {result.candidates:,} configurations in 5% steps; "
+                   f"{result.evaluated:,} were priced exactly, the rest were ruled out by a lower bound. "
+                   f"The baseline tier covers {' and '.join(optimizer.baseline_resolutions(usage.load_sku_drivers()))} "
+                   f"only. Savings compare against the current "
+                   f"resolution mix and storage mix scaled to 100%.")
+
+
+@page_fragment('advanced')
+@timing.timed('forecast_uncertainty')
+def forecast_uncertainty():
+    with st.container(border=True):
+        st.header("Forecast uncertainty")
+        if not st.toggle("Treat usage volumes as forecasts", value=False, key='uncertainty_toggle_input'):
+            return
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            dist = st.selectbox("Distribution", ['uniform', 'normal', 'lognormal'], key='uncertainty_dist_input',
+                                format_func={'uniform': 'Uniform range', 'normal': 'Normal',
+                                             'lognormal': 'Log-normal'}.get)
+        with col2:
+            spread = st.number_input("Uncertainty (%)", min_value=0, max_value=100, step=5, value=20,
+                                     key='uncertainty_spread_input',
+                                     help="Half-width of the range, or the standard deviation as a percent of "
+                                          "the volume (log-normal: sigma of the log)")
+        forecast = dict(st.session_state)
+        for variable in sweep_labels:
+            volume = st.session_state[variable]
+            if dist == 'uniform':
+                forecast[variable] = {'dist': dist, 'low': volume * (1 - spread / 100),
+                                      'high': volume * (1 + spread / 100)}
+            elif dist == 'normal':
+                forecast[variable] = {'dist': dist, 'mean': volume, 'sd': volume * spread / 100}
+            else:
+                forecast[variable] = {'dist': dist, 'median': volume, 'sigma': spread / 100}
+        result = montecarlo.simulate(forecast, rate_card=rate_card)
+        monthly = result.summary.loc['total_spend_developer_plan']
+        annual = result.summary.loc['annual_spend']
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric('Monthly spend (P10 / P90)', f"{format_spend(monthly['P10'])} / {format_spend(monthly['P90'])}")
+        with col2:
+            st.metric('Monthly spend (P50)', format_spend(monthly['P50']))
+        with col3:
+            st.metric('Annual spend (P10 / P90)', f"{format_spend(annual['P10'])} / {format_spend(annual['P90'])}")
+        with col4:
+            st.metric('Annual spend (P50)', format_spend(annual['P50']))
+        crossings = result.tier_crossings[result.tier_crossings['probability'] > 0]
+        if len(crossings):
+            crossings = crossings.assign(start=crossings['start'].map('{:,.0f}'.format),
+                                         probability=crossings['probability'].map('{:.1%}'.format))
+            st.dataframe(crossings,
+                         hide_index=True,
+                         column_config={
+                             'sku': 'SKU name',
+                             'tier': 'Tier',
+                             'start': st.column_config.TextColumn(label='Tier starts at (minutes)',
+                                                                  alignment='right'),
+                             'probability': st.column_config.TextColumn(label='Probability of reaching tier',
+                                                                        alignment='right'),
+                         })
+        st.caption(f"{result.samples:,} seeded samples priced with the current resolution and storage mix.")
+
+
+@page_fragment('advanced')
+@timing.timed('growth_projection')
+def growth_projection():
+    import altair as alt
+
+    with st.container(border=True):
+        st.header("Growth projection")
+        if not st.toggle("Project spend over several months", value=False, key='projection_toggle_input'):
+            return
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            months = st.number_input("Months", min_value=12, max_value=60, step=12, value=24,
+                                     key='projection_months_input')
+        with col2:
+            hot_months = st.number_input("Months hot", min_value=0, max_value=60, value=1,
+                                         key='projection_hot_months_input',
+                                         help="Months a newly encoded asset stays in hot storage")
+        with col3:
+            infrequent_months = st.number_input("Months infrequent", min_value=0, max_value=60, value=2,
+                                                key='projection_infrequent_months_input',
+                                                help="Months an asset spends in infrequent storage before "
+                                                     "moving to cold")
+        projected = dict(st.session_state, hot_months=hot_months, infrequent_months=infrequent_months)
+        col1, col2, col3, col4 = st.columns(4)
+        for col, variable in zip((col1, col2, col3), projection.GROWING_VOLUMES):
+            with col:
+                projected[f"{variable}_growth"] = st.number_input(
+                    f"{sweep_labels[variable]} growth (%/month)", min_value=-100.0, max_value=100.0, step=1.0,
+                    value=0.0, key=f'projection_{variable}_growth_input')
+        result = projection.project(projected, months, rate_card)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric('First month', format_spend(result['total_spend_developer_plan'].iloc[0]))
+        with col2:
+            st.metric('Final month', format_spend(result['total_spend_developer_plan'].iloc[-1]))
+        with col3:
+            st.metric('Cumulative spend', format_spend(result['cumulative_spend'].iloc[-1]))
+        with col4:
+            st.metric('Final library (minutes)', '{:,.0f}'.format(result['storage_volume'].iloc[-1]))
+        x = alt.X('month', title='Month')
+        col1, col2 = st.columns(2)
+        with col1:
+            spend = alt.Chart(result).transform_fold(
+                ['total_spend_developer_plan', 'cumulative_spend'], as_=['series', 'spend']).mark_line().encode(
+                x=x, y=alt.Y('spend:Q', title='Spend ($)'),
+                color=alt.Color('series:N', title=None, scale=alt.Scale(
+                    domain=['total_spend_developer_plan', 'cumulative_spend'])).legend(
+                    labelExpr="datum.label == 'cumulative_spend' ? 'Cumulative' : 'Monthly'"))
+            st.altair_chart(spend)
+        with col2:
+            library = result.assign(hot=result['storage_volume'] * result['hot_percent'] / 100,
+                                    infrequent=result['storage_volume'] * result['infrequent_percent'] / 100,
+                                    cold=result['storage_volume'] * result['cold_percent'] / 100)
+            stored = alt.Chart(library).transform_fold(
+                ['hot', 'infrequent', 'cold'], as_=['lifecycle', 'minutes']).mark_area().encode(
+                x=x, y=alt.Y('minutes:Q', title='Stored minutes', stack=True, axis=alt.Axis(format='~s')),
+                color=alt.Color('lifecycle:N', title=None, sort=['hot', 'infrequent', 'cold']))
+            st.altair_chart(stored)
+        st.caption("New on-demand minutes join the library each month and age from hot to infrequent to cold "
+                   "storage; the current library keeps its lifecycle split and ages on the same schedule.")
+
+
+@page_fragment('advanced')
+@timing.timed('rate_card_comparison')
+def rate_card_comparison():
+    with st.container(border=True):
+        st.header("Rate card comparison")
+        versions = list(rates.rate_card_versions())
+        if len(versions) < 2:
+            st.caption("Add rate card versions as CSV files in app/data/rate_cards (e.g. 2025-01-01.csv) to "
+                       "compare this scenario's spend under them.")
+            return
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            before = st.selectbox("Rate card", versions, index=0, key='compare_before_input')
+        with col2:
+            after = st.selectbox("Compared with", versions, index=1, key='compare_after_input')
+        result = compare.compare_quote(st.session_state, before, after)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(f'Monthly spend ({before})', format_spend(result.before))
+        with col2:
+            st.metric(f'Monthly spend ({after})', format_spend(result.after),
+                      delta=format_spend(result.delta), delta_color='inverse')
+        changed = result.spend_df[result.spend_df['delta'] != 0]
+        if len(changed):
+            st.dataframe(pd.DataFrame({
+                'sku': changed['sku'],
+                'spend_before': changed['spend_before'].map('${:,.2f}'.format),
+                'spend_after': changed['spend_after'].map('${:,.2f}'.format),
+                'delta': changed['delta'].map('{:+,.2f}'.format),
+                'delta_percent': changed['delta_percent'].map('{:+.1f}%'.format),
+            }), hide_index=True, column_config={
+                'sku': 'SKU name',
+                'spend_before': st.column_config.TextColumn(label=before, alignment='right'),
+                'spend_after': st.column_config.TextColumn(label=after, alignment='right'),
+                'delta': st.column_config.TextColumn(label='Change ($)', alignment='right'),
+                'delta_percent': st.column_config.TextColumn(label='Change (%)', alignment='right'),
+            })
+        st.caption("SKU spend (before Starter Plan credits) of the current scenario under each rate card; "
+                   "SKUs whose spend does not change are omitted.")
+
+
 def calculate_gb_volumes():
-    st.session_state.storage_volume = round(st.session_state.library_size_gb * 8 * 1024 / st.session_state.bandwidth_bitrate / 60)
-    st.session_state.streaming_volume = round(st.session_state.bandwidth_gb * 8 * 1024 / st.session_state.bandwidth_bitrate / 60)
-    # Zero out encoding volumes
-    st.session_state.encoding_volume = 0
-    st.session_state.live_encoding_volume = 0
-    update_dataframe()
+    st.session_state.update(usage.calculate_gb_volumes(st.session_state.bandwidth_gb,
+                                                       st.session_state.bandwidth_bitrate,
+                                                       st.session_state.library_size_gb))
+    update_pricing()
 
+@page_fragment('super_advanced')
 def super_advanced():
     st.query_params.clear()
-    update_dataframe()
+    update_pricing()
     with st.container(border=False):
         col1, col2, col3, col4 = st.columns(4)
         with col4:
             st.session_state.baseline_toggle = st.toggle("Use baseline encoding tier", value=False, on_change=update_baseline_toggle, key='baseline_toggle_input', help="Enables Baseline Encoding Tier for all eligible assets")
-    with stylable_container(
+    with styled_container(
       key="container_with_background",
       css_styles="""
             {
@@ -513,7 +692,7 @@ def super_advanced():
             """,
     ):
         st.header("CDN and storage usage per month")
-        spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost = calculate_totals(st.session_state.data)
+        spend_df, storage_spend, encoding_spend, streaming_spend, total_spend, mux_credits, total_spend_developer_plan, developer_plan_cost = calculate_totals()
 
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -533,9 +712,29 @@ selection = st.sidebar.radio("Go to", ["Basic Calculator (Minutes)", "Advanced C
 st.empty()
 
 
+# Each page body is a fragment, so editing an input reruns the page without the shell around it
 if selection == "Basic Calculator (Minutes)":
     home()
 elif selection == "Advanced Calculator (Minutes)":
     advanced()
 elif selection == "Basic Calculator (GBs)":
     super_advanced()
+timing.recorder.end_rerun()
+
+
+if timing.recorder.enabled:
+    with st.sidebar.expander("Timing (debug)"):
+        reruns = timing.recorder.recent()
+        st.dataframe(pd.DataFrame([{'page': rerun['page'], 'scope': rerun['scope'], 'trigger': rerun['trigger'],
+                                    **{stage: seconds * 1000 for stage, seconds in rerun['stages'].items()}}
+                                   for rerun in reversed(reruns)]).round(2),
+                     hide_index=True)
+        st.caption(f"Milliseconds per stage for the last {len(reruns)} reruns, newest first.")
+        cache_stats = cache.scenario_cache.stats()
+        st.caption(f"Quote cache: {cache_stats['hits']:,} hits, {cache_stats['misses']:,} misses "
+                   f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['size']:,} of "
+                   f"{cache_stats['maxsize']:,} entries.")
+        st.download_button("Histograms (JSON)", json.dumps(timing.recorder.to_json()), 'timing.json',
+                           mime='application/json')
+        st.download_button("Histograms (Prometheus)", timing.recorder.to_prometheus(), 'timing.prom',
+                           mime='text/plain')
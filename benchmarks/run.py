@@ -0,0 +1,265 @@
+"""Benchmarks for the pricing hot path and full page reruns.
+
+    python benchmarks/run.py                     # run everything, append to the history
+    python benchmarks/run.py -k spend -k totals  # only benchmarks whose name contains a filter
+    python benchmarks/run.py --compare           # also compare with the previous recorded run
+
+Every run appends one JSON line to ``benchmarks/history.jsonl`` (or ``--history``)
+with the commit, environment and per-benchmark timings, so runs on the same
+machine can be compared across commits. Synthetic scenarios come from a fixed
+seed, so every run prices the same inputs.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+APP_SCRIPT = os.path.join(APP_DIR, 'pricing_calculator.py')
+HISTORY_PATH = os.path.join(ROOT, 'benchmarks', 'history.jsonl')
+PAGES = ('Basic Calculator (Minutes)', 'Advanced Calculator (Minutes)', 'Basic Calculator (GBs)')
+SEED = 0
+REGRESSION_THRESHOLD = 1.10
+
+sys.path.insert(0, APP_DIR)
+
+
+def synthetic_inputs(n_scenarios, seed=SEED):
+    """Columns of calculator inputs with log-normal volumes and random mixes that sum to 100."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    volumes = rng.lognormal(np.log([5_000, 1_000, 50_000, 50_000]), 1.0, (n_scenarios, 4))
+    mix = rng.dirichlet(np.ones(4), n_scenarios) * 100
+    lifecycle = rng.dirichlet(np.ones(3), n_scenarios) * 100
+    return {
+        'encoding_volume': volumes[:, 0], 'live_encoding_volume': volumes[:, 1],
+        'streaming_volume': volumes[:, 2], 'storage_volume': volumes[:, 3],
+        'resolution_mix_720p': mix[:, 0], 'resolution_mix_1080p': mix[:, 1],
+        'resolution_mix_1440p': mix[:, 2], 'resolution_mix_2160p': mix[:, 3],
+        'hot_percent': lifecycle[:, 0], 'infrequent_percent': lifecycle[:, 1], 'cold_percent': lifecycle[:, 2],
+        'baseline_toggle': rng.integers(0, 2, n_scenarios) == 1,
+    }
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """Per-call seconds over ``repeat`` rounds; each round loops until it takes ``min_time``."""
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= max(2, min(10, int(min_time / max(elapsed, 1e-9))))
+    rounds = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        rounds.append((time.perf_counter() - started) / loops)
+    return rounds, loops
+
+
+def cold(statement):
+    """Seconds to run ``statement`` (timed inside a fresh interpreter, excluding its startup)."""
+    code = ("import sys, time; sys.path.insert(0, {app!r}); started = time.perf_counter(); {statement}; "
+            "print(time.perf_counter() - started)").format(app=APP_DIR, statement=statement)
+    return float(subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout)
+
+
+def engine_benchmarks():
+    """Yield ``(name, make)`` pairs; ``make()`` does the setup and returns the callable to time."""
+    import numpy as np
+
+    from pricing import engine, fixedpoint, incremental, rates, totals, usage
+
+    rate_card = rates.load_rate_card()
+    frame = usage.usage_frame(usage.DEFAULT_INPUTS)
+    skus = list(usage.load_sku_drivers().skus)
+
+    def price(n_scenarios, exact=False):
+        scenarios = usage.usage_matrix(synthetic_inputs(n_scenarios), n_scenarios)[1]
+        if exact:
+            return lambda: fixedpoint.price_scenarios_exact(rate_card, skus, scenarios)
+        return lambda: engine.price_scenarios(rate_card, skus, scenarios)
+
+    def update_pricing():
+        quote = incremental.IncrementalQuote(usage.DEFAULT_INPUTS, rate_card)
+        edits = itertools.cycle([dict(usage.DEFAULT_INPUTS, streaming_volume=float(volume))
+                                 for volume in np.random.default_rng(SEED).integers(0, 10_000_000, 64)])
+        return lambda: quote.update(next(edits))
+
+    def calculate_totals():
+        spend_df = engine.calculate_spend(frame, rate_card)
+        return lambda: totals.calculate_totals(spend_df)
+
+    yield 'load_pricing_csv (cold)', lambda: lambda: cold('from pricing.rates import load_pricing_csv; '
+                                                          'load_pricing_csv()')
+    yield 'load_pricing_csv (warm)', lambda: rates.load_pricing_csv
+    yield 'load_rate_card (cold)', lambda: lambda: cold('from pricing.rates import load_rate_card; load_rate_card()')
+    yield 'usage_frame', lambda: lambda: usage.usage_frame(usage.DEFAULT_INPUTS)
+    yield 'update_pricing (streaming edit)', update_pricing
+    yield 'calculate_spend (1 scenario)', lambda: lambda: engine.calculate_spend(frame, rate_card)
+    yield 'calculate_spend (1k scenarios)', lambda: price(1_000)
+    yield 'calculate_spend (1M scenarios)', lambda: price(1_000_000)
+    yield 'calculate_spend exact (1M scenarios)', lambda: price(1_000_000, exact=True)
+    yield 'calculate_totals', calculate_totals
+
+
+def streamlit_benchmarks():
+    from streamlit.testing.v1 import AppTest
+
+    from pricing import timing
+
+    def in_root(func):
+        # The logo path in the script is relative to the repository root
+        def call():
+            cwd = os.getcwd()
+            os.chdir(ROOT)
+            try:
+                return func()
+            finally:
+                os.chdir(cwd)
+        return call
+
+    def display_totals():
+        # Timed by the page's own timing span, so only display_totals is measured
+        app = AppTest.from_file(APP_SCRIPT, default_timeout=60)
+
+        def rerun():
+            timing.recorder.enabled = True
+            try:
+                app.run()
+            finally:
+                timing.recorder.enabled = False
+            if app.exception:
+                raise RuntimeError(f"display_totals raised: {app.exception}")
+            return timing.recorder.recent()[-1]['stages']['display_totals']
+        return in_root(rerun)
+
+    def page_rerun(page):
+        app = in_root(AppTest.from_file(APP_SCRIPT, default_timeout=60).run)()
+        in_root(app.sidebar.radio[0].set_value(page).run)()
+        if app.exception:
+            raise RuntimeError(f"{page} raised: {app.exception}")
+        return in_root(app.run)
+
+    yield 'display_totals', display_totals
+    for page in PAGES:
+        yield f"page rerun: {page}", lambda page=page: page_rerun(page)
+
+
+def run_benchmarks(filters=(), repeat=5):
+    results = {}
+    for group in (engine_benchmarks, streamlit_benchmarks):
+        for name, make in group():
+            if filters and not any(f.lower() in name.lower() for f in filters):
+                continue
+            func = make()
+            if name.endswith('(cold)'):
+                # Timed inside a fresh process; one call per round
+                rounds, loops = [func() for _ in range(repeat)], 1
+            elif name == 'display_totals':
+                # Timed inside the script run, after one warm-up run
+                func()
+                rounds, loops = [func() for _ in range(repeat)], 1
+            else:
+                rounds, loops = measure(func, repeat)
+            results[name] = {'median_s': statistics.median(rounds), 'min_s': min(rounds), 'rounds': len(rounds),
+                             'loops': loops}
+            print(f"{name:45s} {_format_seconds(results[name]['median_s']):>10s}  "
+                  f"(min {_format_seconds(results[name]['min_s'])}, {loops} loops x {len(rounds)})", flush=True)
+    return results
+
+
+def _format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+    import streamlit
+
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=ROOT, check=True, capture_output=True, text=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'machine': platform.node(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': streamlit.__version__,
+        'seed': SEED,
+    }
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(previous, current):
+    """Print the change of every benchmark against ``previous``; returns the names that regressed."""
+    regressed = []
+    print(f"\nCompared with {(previous.get('commit') or 'unknown')[:12]} ({previous.get('timestamp')}):")
+    for name, result in current['results'].items():
+        before = previous['results'].get(name)
+        if before is None:
+            continue
+        ratio = result['median_s'] / before['median_s']
+        flag = ''
+        if ratio > REGRESSION_THRESHOLD:
+            flag = '  REGRESSION'
+            regressed.append(name)
+        print(f"{name:45s} {_format_seconds(before['median_s']):>10s} -> "
+              f"{_format_seconds(result['median_s']):>10s}  x{ratio:.2f}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pricing calculator.")
+    parser.add_argument('-k', dest='filters', action='append', default=[],
+                        help="only run benchmarks whose name contains this text (repeatable)")
+    parser.add_argument('--repeat', type=int, default=5, help="timing rounds per benchmark (default: 5)")
+    parser.add_argument('--history', default=HISTORY_PATH, help=f"history file (default: {HISTORY_PATH})")
+    parser.add_argument('--no-save', action='store_true', help="do not append this run to the history")
+    parser.add_argument('--compare', action='store_true',
+                        help="compare with the previous run in the history; exit 1 on a regression")
+    args = parser.parse_args(argv)
+
+    history = load_history(args.history)
+    record = {**environment(), 'results': run_benchmarks(args.filters, args.repeat)}
+    if not args.no_save:
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    if args.compare and history:
+        if compare(history[-1], record):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
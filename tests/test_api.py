@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('flask')
+
+from pricing.api import create_app  # noqa: E402
+from pricing.rates import load_rate_card  # noqa: E402
+from pricing.totals import quote  # noqa: E402
+from pricing.usage import DEFAULT_INPUTS  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def client():
+    return create_app(load_rate_card()).test_client()
+
+
+def test_quote_matches_the_calculator(client):
+    response = client.post('/quote', json={'streaming_volume': 50000})
+    assert response.status_code == 200
+    expected = quote(dict(DEFAULT_INPUTS, streaming_volume=50000))
+    assert response.get_json()['total_spend_developer_plan'] == pytest.approx(expected.total_spend_developer_plan)
+
+
+@pytest.mark.parametrize('scenario, message', [
+    ({'streaming_volume': 1e13}, 'outside its pricing tiers'),
+    ({'resolution_mix_720p': 500}, 'between 0 and 100'),
+    ({'hot_percent': 100.5}, 'between 0 and 100'),
+    ({'storage_volume': -1}, 'non-negative'),
+    ({'storage_volume': '10'}, 'non-negative'),
+    ({'baseline_toggle': 1}, 'true or false'),
+    ({'bandwidth_gb': 10}, 'Unknown inputs'),
+])
+def test_invalid_scenarios_are_bad_requests(client, scenario, message):
+    for response in (client.post('/quote', json=scenario),
+                     client.post('/quote/batch', json={'scenarios': [{}, scenario]})):
+        assert response.status_code == 400
+        assert message in response.get_json()['error']
@@ -0,0 +1,46 @@
+import os
+
+from pricing import cache, rates, sweep
+from pricing.usage import DEFAULT_INPUTS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sections_are_keyed_on_their_params_and_the_pricing_inputs():
+    section_cache = cache.ScenarioCache()
+    rate_card = rates.load_rate_card()
+    calls = []
+
+    def section(inputs, params=1):
+        return cache.cached_section('section', params, inputs, rate_card, lambda: calls.append(params) or len(calls),
+                                    section_cache)
+
+    assert section(DEFAULT_INPUTS) == 1
+    # Inputs that do not change the price, and ints equal to floats, share an entry
+    assert section(dict(DEFAULT_INPUTS, bandwidth_gb=5, streaming_volume=20000.0)) == 1
+    assert section(dict(DEFAULT_INPUTS, streaming_volume=20001)) == 2
+    assert section(DEFAULT_INPUTS, params=2) == 3
+    assert section_cache.stats()['hits'] == 1
+
+
+def test_advanced_page_reuses_the_spend_curve_until_its_inputs_change(monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    calls = []
+    spend_curve = sweep.spend_curve
+    monkeypatch.setattr(sweep, 'spend_curve', lambda *args: calls.append(args[0]) or spend_curve(*args))
+    monkeypatch.setattr(cache, 'section_cache', cache.ScenarioCache(cache.SECTION_MAXSIZE))
+    # The logo path in the page is relative to the repository root
+    monkeypatch.chdir(ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, 'app', 'pricing_calculator.py'), default_timeout=60).run()
+    app.sidebar.radio[0].set_value('Advanced Calculator (Minutes)').run()
+    assert calls == ['streaming_volume']
+    assert len(app.get('vega_lite_chart')) == 2
+    app.run()
+    app.number_input(key='budget_input').set_value(2000).run()
+    # The streaming curve does not depend on the current streaming volume
+    app.number_input(key='streaming_volume_input').set_value(50000).run()
+    assert calls == ['streaming_volume']
+    app.number_input(key='encoding_volume_input').set_value(5000).run()
+    assert calls == ['streaming_volume'] * 2
+    assert not app.exception
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pricing.engine import RateCard, calculate_spend, price_scenarios
+from pricing.rates import load_pricing_csv
+
+
+@pytest.fixture(scope='module')
+def tiers():
+    return load_pricing_csv()
+
+
+@pytest.fixture(scope='module')
+def rate_card(tiers):
+    return RateCard.from_frame(tiers)
+
+
+def baseline_spend(tiers, sku, usage):
+    """The original row-by-row rule: the tier with start <= usage < end."""
+    for _, tier in tiers[tiers['unique_key'] == sku].iterrows():
+        if tier['start'] <= usage < tier['end']:
+            return tier['previous_tier_max_spend'] + (usage - tier['start']) * tier['price']
+    raise LookupError(sku, usage)
+
+
+def edge_usage(tiers):
+    """Every tier's start, just below and above it, and just below its end."""
+    for tier in tiers.itertuples():
+        for usage in (tier.start, tier.start + 0.5, tier.start + 1, tier.end - 1, tier.end - 0.5):
+            yield tier.unique_key, float(usage)
+        if tier.start > 0:
+            yield tier.unique_key, tier.start - 0.5
+
+
+def test_calculate_spend_matches_baseline_at_tier_edges(tiers, rate_card):
+    skus, usage = zip(*edge_usage(tiers))
+    df = pd.DataFrame({'SKU Name': skus, 'Usage Value': usage})
+    result = calculate_spend(df, rate_card)
+    expected = [baseline_spend(tiers, sku, value) for sku, value in zip(skus, usage)]
+    np.testing.assert_allclose(result['total_spend'], expected, rtol=1e-12)
+    with np.errstate(invalid='ignore'):
+        expected_rate = np.array(expected) / np.array(usage)
+    np.testing.assert_allclose(result['effective_rate'], expected_rate, rtol=1e-12)
+    categories = tiers.groupby('unique_key')['sku_category'].first()
+    assert list(result['sku_category']) == list(categories[list(skus)])
+
+
+def test_zero_usage_has_no_spend_and_nan_effective_rate(tiers, rate_card):
+    skus = list(pd.unique(tiers['unique_key']))
+    result = calculate_spend(pd.DataFrame({'SKU Name': skus, 'Usage Value': 0.0}), rate_card)
+    assert (result['total_spend'] == 0).all()
+    assert result['effective_rate'].isna().all()
+
+
+def test_price_scenarios_matches_baseline(tiers, rate_card):
+    rng = np.random.default_rng(0)
+    skus = list(pd.unique(tiers['unique_key']))
+    usage = np.round(10 ** rng.uniform(0, 6, size=(20, len(skus))), 3)
+    usage[0] = 0
+    usage[1] = 5000
+    spend = price_scenarios(rate_card, skus, usage)
+    for i in range(usage.shape[0]):
+        for j, sku in enumerate(skus):
+            assert math.isclose(spend[i, j], baseline_spend(tiers, sku, usage[i, j]), rel_tol=1e-12, abs_tol=1e-12)
+
+
+@pytest.mark.parametrize('usage', [-1.0, 1e12, 5e12, math.nan])
+def test_usage_outside_the_rate_card_is_rejected(rate_card, usage):
+    with pytest.raises(ValueError, match='outside its pricing tiers'):
+        calculate_spend(pd.DataFrame({'SKU Name': ['live_encoding_720p'], 'Usage Value': [usage]}), rate_card)
+    with pytest.raises(ValueError, match='outside its pricing tiers'):
+        price_scenarios(rate_card, ['live_encoding_720p'], [[usage]])
+
+
+def test_unknown_sku_is_rejected(rate_card):
+    with pytest.raises(KeyError, match='No pricing tiers'):
+        price_scenarios(rate_card, ['no_such_sku'], [[1.0]])
+
+
+def test_matrix_width_must_match_skus(rate_card):
+    with pytest.raises(ValueError, match='columns'):
+        price_scenarios(rate_card, ['live_encoding_720p'], np.zeros((2, 3)))
@@ -0,0 +1,101 @@
+import decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pricing.engine import RateCard
+from pricing.fixedpoint import (INT64_MAX, MICROS, USAGE_SCALE, ExactRateCard, calculate_batch_totals_exact,
+                                calculate_spend_exact, effective_rate, price_scenarios_exact, quantize_usage,
+                                quote_exact)
+from pricing.rates import RateCardError, load_pricing_csv, load_rate_card
+from pricing.totals import STARTER_PLAN_COST, STARTER_PLAN_CREDIT
+from pricing.usage import DEFAULT_INPUTS
+
+
+def single_tier_card(price, end=1e12, previous_tier_max_spend=0.0):
+    return RateCard(['sku'], ['Storage'], [[0.0]], [end], [[price]], [[previous_tier_max_spend]])
+
+
+def decimal_spend(tiers, sku, usage_milli):
+    """Spend in micro-dollars by the documented rule, in exact decimal arithmetic."""
+    usage = decimal.Decimal(int(usage_milli)) / USAGE_SCALE
+    for tier in tiers[tiers['unique_key'] == sku].itertuples():
+        if decimal.Decimal(str(tier.start)) <= usage < decimal.Decimal(str(tier.end)):
+            spend = (decimal.Decimal(str(tier.previous_tier_max_spend))
+                     + (usage - decimal.Decimal(str(tier.start))) * decimal.Decimal(repr(tier.price)))
+            return int((spend * MICROS).quantize(decimal.Decimal(1), rounding=decimal.ROUND_HALF_UP))
+    raise LookupError(sku, usage)
+
+
+def test_price_scenarios_exact_matches_decimal_reference():
+    tiers = load_pricing_csv()
+    rate_card = load_rate_card()
+    rng = np.random.default_rng(0)
+    skus = list(pd.unique(tiers['unique_key']))
+    # Thousandths of a unit quantize without loss, so the reference sees the same usage
+    usage = np.round(10 ** rng.uniform(-3, 7, size=(2000 // len(skus) + 1, len(skus))), 3)
+    usage[0] = [float(tier_start) for tier_start in tiers.groupby('unique_key')['start'].max()[skus]]
+    spend = price_scenarios_exact(rate_card, skus, usage)
+    assert spend.dtype == np.int64
+    usage_milli = quantize_usage(usage)
+    for (i, j), micros in np.ndenumerate(spend):
+        assert micros == decimal_spend(tiers, skus[j], usage_milli[i, j])
+
+
+def test_batch_totals_are_exact_sums_with_the_starter_plan():
+    rate_card = load_rate_card()
+    exact = quote_exact(DEFAULT_INPUTS, rate_card)
+    spend = exact.spend_df['total_spend_micros'].to_numpy()
+    categories = exact.spend_df['sku_category'].to_numpy()
+    totals = calculate_batch_totals_exact(np.vstack([spend, spend * 0, spend * 1000]), categories)
+    usage_spend = np.array([spend.sum(), 0, spend.sum() * 1000])
+    np.testing.assert_array_equal(totals['total_spend'], usage_spend - STARTER_PLAN_CREDIT * MICROS)
+    np.testing.assert_array_equal(totals['mux_credits'], -np.minimum(usage_spend, STARTER_PLAN_CREDIT * MICROS))
+    np.testing.assert_array_equal(totals['total_spend_developer_plan'],
+                                  np.maximum(usage_spend - STARTER_PLAN_CREDIT * MICROS, STARTER_PLAN_COST * MICROS))
+    assert exact.total_spend_developer_plan == totals['total_spend_developer_plan'][0]
+
+
+def test_usage_quantizes_half_up():
+    # Binary fractions, so the halves are exact
+    usage = np.array([0.0625, 0.1875, 0.0624, 2.0])
+    np.testing.assert_array_equal(quantize_usage(usage), [63, 188, 62, 2000])
+    assert (quantize_usage(np.array([-0.25])) < 0).all()
+
+
+def test_spend_rounds_half_up_to_a_micro_dollar():
+    # One micro-dollar per unit: spend is usage in thousandths of a micro-dollar
+    card = single_tier_card(0.000001)
+    df = pd.DataFrame({'SKU Name': ['sku'] * 5, 'Usage Value': [0.499, 0.5, 1.5, 2.5, 2.501]})
+    assert calculate_spend_exact(df, card)['total_spend_micros'].tolist() == [0, 1, 2, 3, 3]
+
+
+def test_effective_rate_rounds_half_up_and_is_zero_without_usage():
+    spend = np.array([5, 1, 1, 3, 0])
+    usage = np.array([0, 2, 3, 2000, 1000])
+    np.testing.assert_array_equal(effective_rate(spend, usage), [0, 500, 333, 2, 0])
+    df = pd.DataFrame({'SKU Name': ['sku'], 'Usage Value': [0.0]})
+    assert calculate_spend_exact(df, single_tier_card(0.25))['effective_rate_micros'].tolist() == [0]
+
+
+def test_prices_must_be_whole_micro_dollars():
+    with pytest.raises(RateCardError, match='price'):
+        ExactRateCard(single_tier_card(0.0000001))
+
+
+def test_usage_that_would_overflow_int64_is_rejected():
+    exact = ExactRateCard(single_tier_card(1000.0))
+    price = 1000 * MICROS
+    # The 1e12 tier end is cut back to the largest usage whose spend fits in int64
+    assert exact.max_usage == (INT64_MAX - USAGE_SCALE // 2) // price
+    assert exact.end[0] == exact.max_usage + 1
+    rows = exact.rows(['sku'])
+    largest = np.array([exact.max_usage])
+    assert exact.spend(rows, largest)[0] == (exact.max_usage * price + USAGE_SCALE // 2) // USAGE_SCALE
+    with pytest.raises(ValueError, match='too large to price exactly'):
+        exact.spend(rows, largest + 1)
+    with pytest.raises(ValueError, match='negative or not a number'):
+        exact.spend(rows, np.array([-1]))
+    with pytest.raises(ValueError, match='negative or not a number'):
+        exact.spend(rows, quantize_usage(np.array([np.nan])))
@@ -0,0 +1,74 @@
+import gzip
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from pricing.ingest import DEFAULT_BITRATE_LADDER, calculator_inputs, ingest_logs  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('rendition, resolution', [
+    ('4k', '2160p'), ('UHD', '2160p'), ('1920x1080', '1080p'), ('1080p60', '1080p'), ('1080', '1080p'),
+    ('1100p', '1440p'), ('4320p', '2160p'), ('480p', '720p'), ('audio', '720p'), ('hls_3000k', '720p'),
+    (1080, '1080p'), (None, '720p'),
+])
+def test_renditions_are_billed_at_the_next_calculator_resolution(tmp_path, rendition, resolution):
+    path = tmp_path / 'cdn.jsonl.gz'
+    with gzip.open(path, 'wt') as f:
+        for _ in range(3):
+            f.write(json.dumps({'bytes': 2 ** 30, 'resolution': rendition, 'asset_id': 'a'}) + '\n')
+    result = ingest_logs([str(path)])
+    index = result.resolutions.index(resolution)
+    expected = np.zeros(len(result.resolutions))
+    # Three GB at the resolution's bitrate, as usage.calculate_gb_volumes converts them
+    expected[index] = 3 * 8 * 1024 / DEFAULT_BITRATE_LADDER[resolution] / 60
+    np.testing.assert_allclose(result.minutes, expected)
+    assert result.inputs[f"resolution_mix_{resolution}"] == 100
+
+
+def test_watch_seconds_and_asset_durations(tmp_path):
+    path = tmp_path / 'playback.csv'
+    path.write_text('seconds,resolution,asset_id,asset_duration\n'
+                    '600,1080p,a,1200\n'
+                    '300,720p,a,1200\n'
+                    '60,4k,b,120\n')
+    result = ingest_logs([str(path)], period_days=None)
+    assert result.inputs['streaming_volume'] == 16
+    assert result.inputs['storage_volume'] == 22
+    assert result.assets['minutes'].tolist() == [15, 1]
+
+
+def test_resolution_mix_is_whole_percent_summing_to_100():
+    resolutions = tuple(DEFAULT_BITRATE_LADDER)
+    for minutes in ([1, 1, 1, 0], [0.333, 0.333, 0.334, 0], [1e-9, 1, 1, 1], [7, 0, 0, 0]):
+        inputs = calculator_inputs(resolutions, np.array(minutes, dtype=float))
+        mix = [inputs[f"resolution_mix_{resolution}"] for resolution in resolutions]
+        assert all(type(percent) is int for percent in mix)
+        assert sum(mix) == 100
+    assert calculator_inputs(resolutions, np.array([1.0, 1.0, 1.0, 0.0]))['resolution_mix_720p'] == 34
+
+
+def test_ingested_share_link_loads_in_the_advanced_page(tmp_path, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+
+    from pricing.sharing import encode
+    from pricing.usage import DEFAULT_INPUTS
+
+    path = tmp_path / 'cdn.jsonl'
+    path.write_text(''.join(json.dumps({'bytes': 2 ** 30 * n, 'resolution': rendition}) + '\n'
+                            for n, rendition in [(1, '720p'), (1, '1080p'), (1, '4k')]))
+    inputs = ingest_logs([str(path)]).inputs
+    # The logo path in the page is relative to the repository root
+    monkeypatch.chdir(ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, 'app', 'pricing_calculator.py'), default_timeout=60)
+    app.query_params['s'] = encode(dict(DEFAULT_INPUTS, **inputs))
+    app.run()
+    app.sidebar.radio[0].set_value('Advanced Calculator (Minutes)').run()
+    assert not app.exception
+    assert not app.warning
+    assert app.session_state['resolution_mix_1080p'] == inputs['resolution_mix_1080p']
@@ -0,0 +1,12 @@
+import math
+
+from pricing import loadtest
+
+
+def test_requests_without_a_response_are_reported_as_failed():
+    # Nothing listens on a freshly freed port, so every request fails to connect
+    result = loadtest.run(f"http://127.0.0.1:{loadtest._free_port()}", 20, concurrency=4)
+    assert result['failed'] == 20
+    assert result['completed'] == 0
+    assert math.isnan(result['p50_ms']) and math.isnan(result['p99_ms'])
+    assert result['requests_per_second'] == 0
@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+import pytest
+
+from pricing.optimizer import baseline_resolutions, candidate_configurations, optimize
+from pricing.totals import quote
+from pricing.usage import DEFAULT_INPUTS, load_sku_drivers
+
+ABOVE_1080P = ('resolution_mix_1440p', 'resolution_mix_2160p')
+
+
+def test_baseline_covers_only_resolutions_with_baseline_skus():
+    assert baseline_resolutions(load_sku_drivers()) == ('720p', '1080p')
+
+
+def test_baseline_candidates_have_no_share_above_1080p():
+    drivers = load_sku_drivers()
+    candidates = candidate_configurations(drivers.resolutions, step=10, baseline=baseline_resolutions(drivers))
+    above = sum(candidates[key] for key in ABOVE_1080P)
+    assert not (candidates['baseline_toggle'] & (above > 0)).any()
+    # Smart-tier candidates still cover every mix
+    assert (~candidates['baseline_toggle'] & (above == 100)).any()
+
+
+@pytest.mark.parametrize('inputs', [
+    DEFAULT_INPUTS,
+    dict(DEFAULT_INPUTS, encoding_volume=100_000, storage_volume=600_000, streaming_volume=2_000),
+    dict(DEFAULT_INPUTS, resolution_mix_720p=0, resolution_mix_2160p=100, baseline_toggle=True),
+])
+def test_no_option_combines_baseline_with_video_above_1080p(inputs):
+    options = optimize(inputs, top=20).options
+    above = options[list(ABOVE_1080P)].sum(axis=1)
+    assert not (options['baseline_toggle'] & (above > 0)).any()
+    # Every option is priced as the calculator would price it
+    for option in options.to_dict('records'):
+        expected = quote({**inputs, **option}).total_spend_developer_plan
+        assert option['total_spend_developer_plan'] == pytest.approx(expected)
+
+
+def test_savings_compare_against_the_current_mix_scaled_to_100():
+    half = dict(DEFAULT_INPUTS, resolution_mix_720p=50)
+    result = optimize(half)
+    assert result.current_spend == pytest.approx(quote(DEFAULT_INPUTS).total_spend_developer_plan)
+    assert (result.options['savings'] >= -1e-9).all()
+    empty = optimize(dict(DEFAULT_INPUTS, resolution_mix_720p=0))
+    assert math.isnan(empty.current_spend)
+    assert np.isnan(empty.options['savings']).all()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from pricing.portfolio import price_portfolio
+from pricing.rates import load_rate_card
+from pricing.totals import STARTER_PLAN_COST, quote_batch
+from pricing.usage import DEFAULT_INPUTS, usage_matrix
+
+N_ACCOUNTS = 500
+
+
+@pytest.fixture(scope='module')
+def accounts():
+    rng = np.random.default_rng(0)
+    accounts = {key: np.full(N_ACCOUNTS, value) for key, value in DEFAULT_INPUTS.items()}
+    for key in ('encoding_volume', 'live_encoding_volume', 'storage_volume', 'streaming_volume'):
+        accounts[key] = np.round(10 ** rng.uniform(1, 5, N_ACCOUNTS))
+    accounts['resolution_mix_720p'] = rng.uniform(0, 100, N_ACCOUNTS)
+    accounts['resolution_mix_1080p'] = 100 - accounts['resolution_mix_720p']
+    # About a third of the accounts price alone
+    pools = rng.integers(0, 60, N_ACCOUNTS).astype(object)
+    pools[rng.random(N_ACCOUNTS) < 0.3] = None
+    return accounts, pools
+
+
+@pytest.mark.parametrize('plan', ['account', 'pool'])
+def test_allocations_sum_back_to_each_pools_tiered_spend(accounts, plan):
+    inputs, pools = accounts
+    rate_card = load_rate_card()
+    result = price_portfolio(inputs, pools, plan, rate_card, include_sku_spend=True)
+    codes = result.accounts['pool'].map({pool: i for i, pool in enumerate(result.pools['pool'])})
+    labelled = codes.notna().to_numpy()
+    skus, usage = usage_matrix(inputs, N_ACCOUNTS)
+    rows = rate_card.rows(skus)
+    for code in np.unique(codes[labelled]).astype(int):
+        members = labelled & (codes == code).to_numpy()
+        pool_spend = rate_card.spend(rows, usage[members].sum(axis=0))
+        np.testing.assert_allclose(result.sku_spend[members].sum(axis=0), pool_spend, atol=1e-9)
+    for column in ('total_spend', 'mux_credits', 'total_spend_developer_plan'):
+        assert result.accounts[column].sum() == pytest.approx(result.pools[column].sum())
+    assert result.pools['accounts'].sum() == N_ACCOUNTS
+
+
+@pytest.mark.parametrize('plan', ['account', 'pool'])
+def test_unpooled_accounts_match_their_standalone_bills(accounts, plan):
+    inputs, pools = accounts
+    result = price_portfolio(inputs, pools, plan)
+    alone = result.accounts[result.accounts['pool'].isna()]
+    assert len(alone)
+    np.testing.assert_allclose(alone['total_spend_developer_plan'], alone['standalone_spend_developer_plan'])
+    assert (alone['developer_plan_cost'] == STARTER_PLAN_COST).all()
+
+
+@pytest.mark.parametrize('plan', ['account', 'pool'])
+def test_without_pools_the_bills_match_quote_batch(accounts, plan):
+    inputs, _ = accounts
+    result = price_portfolio(inputs, None, plan)
+    expected = quote_batch(inputs, N_ACCOUNTS)
+    for column, values in expected.items():
+        np.testing.assert_allclose(result.accounts[column], values)
+    assert (result.pools['pooling_savings'].abs() < 1e-6).all()
+    assert (result.pools['plan_savings'].abs() < 1e-6).all()
+
+
+@pytest.mark.parametrize('plan', ['account', 'pool'])
+def test_pooling_savings_compare_bills_under_the_same_plan(accounts, plan):
+    inputs, pools = accounts
+    result = price_portfolio(inputs, pools, plan)
+    # Pooled tiers never cost more than tiering each account alone
+    assert (result.pools['pooling_savings'] >= -1e-6).all()
+    difference = result.pools['standalone_spend_developer_plan'] - result.pools['total_spend_developer_plan']
+    np.testing.assert_allclose(result.pools['pooling_savings'] + result.pools['plan_savings'], difference,
+                               atol=1e-6)
+    if plan == 'account':
+        assert (result.pools['plan_savings'].abs() < 1e-6).all()
+
+
+def test_pools_can_be_a_column_of_accounts(accounts):
+    inputs, pools = accounts
+    by_column = price_portfolio({**inputs, 'contract': pools}, 'contract')
+    np.testing.assert_allclose(by_column.accounts['total_spend_developer_plan'],
+                               price_portfolio(inputs, pools).accounts['total_spend_developer_plan'])
+    with pytest.raises(ValueError, match='Unknown plan'):
+        price_portfolio(inputs, pools, 'contract')
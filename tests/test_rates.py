@@ -0,0 +1,45 @@
+import os
+import stat
+import warnings
+
+import pytest
+
+from pricing import rates
+
+
+@pytest.fixture
+def compiled_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rates, 'COMPILED_DIR', str(tmp_path / 'compiled'))
+    return tmp_path / 'compiled'
+
+
+def test_artifact_is_readable_by_other_users(compiled_dir):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', rates.RateCardWarning)
+        path = rates.build_artifact(rates.RATES_PATH)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o755
+    for name in os.listdir(path):
+        assert os.stat(os.path.join(path, name)).st_mode & stat.S_IROTH
+    assert not [name for name in os.listdir(compiled_dir) if name.startswith('.building-')]
+
+
+def test_drift_is_reported_once_per_build(compiled_dir):
+    _, drift = rates.validate_rate_card(rates.load_pricing_csv(rates.RATES_PATH))
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', rates.RateCardWarning)
+        rates.build_artifact(rates.RATES_PATH)
+    messages = [str(warning.message) for warning in caught if warning.category is rates.RateCardWarning]
+    assert len(messages) == (1 if drift else 0)
+    if drift:
+        assert f"{len(drift)} tier(s)" in messages[0]
+
+
+def test_unreadable_artifact_falls_back_to_an_in_memory_card(compiled_dir, monkeypatch):
+    def unreadable(path, digest=None):
+        raise rates.RateCardError(f"{path} is unreadable")
+
+    monkeypatch.setattr(rates, 'load_artifact', unreadable)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', rates.RateCardWarning)
+        rate_card = rates.compile_rate_card(rates.RATES_PATH)
+    assert rate_card.version == rates.content_hash(rates.RATES_PATH)